@@ -7,11 +7,16 @@ Run: python demo.py
 """
 from __future__ import annotations
 
+import asyncio
 import json
-import time
+import os
+import string
+import sys
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Dict, List
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Try to import rich for beautiful output
 try:
@@ -19,13 +24,76 @@ try:
     from rich.table import Table
     from rich.panel import Panel
     from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+    from rich.text import Text
     from rich import box
-    RICH_AVAILABLE = True
+    RICH_IMPORTED = True
 except ImportError:
-    RICH_AVAILABLE = False
+    RICH_IMPORTED = False
+
+
+def _rich_enabled() -> bool:
+    """Use rich only for interactive terminals unless FORCE_COLOR/NO_COLOR say otherwise."""
+    if not RICH_IMPORTED:
+        return False
+    force_color = os.environ.get("FORCE_COLOR")
+    if force_color is not None:
+        return force_color != "0"
+    if os.environ.get("NO_COLOR") is not None:
+        return False
+    return sys.stdout.isatty()
+
+
+RICH_AVAILABLE = _rich_enabled()
+
+# orjson is optional; fall back to the stdlib encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 console = Console() if RICH_AVAILABLE else None
 
+BANNER_MARKUP = """
+[bold cyan]╔═══════════════════════════════════════════════════════════════════╗
+║[/bold cyan] [bold gold1]       ____                _     _     _   _                       [/bold gold1][bold cyan]║
+║[/bold cyan] [bold gold1]  ___ | __ )  __ _ _   _  | |   (_)___| |_(_)_ __   __ _           [/bold gold1][bold cyan]║
+║[/bold cyan] [bold gold1] / _ \|  _ \ / _` | | | | | |   | / __| __| | '_ \ / _` |          [/bold gold1][bold cyan]║
+║[/bold cyan] [bold gold1]|  __/| |_) | (_| | |_| | | |___| \__ \ |_| | | | | (_| |          [/bold gold1][bold cyan]║
+║[/bold cyan] [bold gold1] \___||____/ \__,_|\__, | |_____|_|___/\__|_|_| |_|\__, |          [/bold gold1][bold cyan]║
+║[/bold cyan] [bold gold1]                   |___/                           |___/           [/bold gold1][bold cyan]║
+║[/bold cyan]                                                                       [bold cyan]║
+║[/bold cyan]            [bold white]AI-Generated Professional Listings at Scale[/bold white]            [bold cyan]║
+╚═══════════════════════════════════════════════════════════════════╝[/bold cyan]
+"""
+
+AI_FINDINGS = (
+    ("GPT-4V", "Limited edition print, authentic signature", "[green]96%[/green]"),
+    ("Claude", "Style matches known artist catalog", "[green]94%[/green]"),
+    ("Gemini", "Condition excellent, no restoration", "[green]92%[/green]"),
+    ("Grok", "Market value aligned with recent sales", "[yellow]87%[/yellow]"),
+)
+
+PRICE_PANEL_TEMPLATE = string.Template("""
+[bold]Suggested Price:[/bold] [bold green]$$${price}[/bold green]
+
+[dim]Market Analysis:[/dim]
+  Low estimate:  $$${low}
+  High estimate: $$${high}
+
+[dim]Pricing factors:[/dim]
+  • Artist demand:  [cyan]████████░░[/cyan] High
+  • Condition:      [green]██████████[/green] ${condition}
+  • Edition rarity: [yellow]███████░░░[/yellow] ${edition}
+""")
+
+# Parse the static markup once instead of on every print
+if RICH_AVAILABLE:
+    BANNER = Text.from_markup(BANNER_MARKUP)
+    AI_FINDING_ROWS = tuple(
+        (model, finding, Text.from_markup(conf)) for model, finding, conf in AI_FINDINGS
+    )
+
 
 def print_header(text: str) -> None:
     if RICH_AVAILABLE:
@@ -40,27 +108,18 @@ def print_header(text: str) -> None:
 
 def show_banner() -> None:
     if RICH_AVAILABLE:
-        banner = """
-[bold cyan]╔═══════════════════════════════════════════════════════════════════╗
-║[/bold cyan] [bold gold1]       ____                _     _     _   _                       [/bold gold1][bold cyan]║
-║[/bold cyan] [bold gold1]  ___ | __ )  __ _ _   _  | |   (_)___| |_(_)_ __   __ _           [/bold gold1][bold cyan]║
-║[/bold cyan] [bold gold1] / _ \|  _ \ / _` | | | | | |   | / __| __| | '_ \ / _` |          [/bold gold1][bold cyan]║
-║[/bold cyan] [bold gold1]|  __/| |_) | (_| | |_| | | |___| \__ \ |_| | | | | (_| |          [/bold gold1][bold cyan]║
-║[/bold cyan] [bold gold1] \___||____/ \__,_|\__, | |_____|_|___/\__|_|_| |_|\__, |          [/bold gold1][bold cyan]║
-║[/bold cyan] [bold gold1]                   |___/                           |___/           [/bold gold1][bold cyan]║
-║[/bold cyan]                                                                       [bold cyan]║
-║[/bold cyan]            [bold white]AI-Generated Professional Listings at Scale[/bold white]            [bold cyan]║
-╚═══════════════════════════════════════════════════════════════════╝[/bold cyan]
-"""
-        console.print(banner)
+        console.print(BANNER)
     else:
         print("\n" + "="*60)
         print("  eBAY LISTING AUTOMATION")
         print("="*60 + "\n")
 
 
-@dataclass
+@dataclass(frozen=True)
 class ProductData:
+    # dataclass(slots=True) needs Python 3.10; declare the slots by hand
+    __slots__ = ('sku', 'title', 'artist', 'medium', 'year', 'size', 'edition', 'condition', 'price')
+
     sku: str
     title: str
     artist: str
@@ -84,72 +143,93 @@ SAMPLE_INVENTORY = [
 ]
 
 
-def simulate_ai_analysis(product: ProductData) -> Dict:
+AI_MODELS = ('GPT-4V', 'Claude', 'Gemini', 'Grok')
+
+# Suggested price range as multiples of the asking price
+PRICE_RANGE_LOW = 0.9
+PRICE_RANGE_HIGH = 1.2
+
+# Image filename suffixes appended to each SKU
+IMAGE_SUFFIXES = tuple(f"_{i}.jpg" for i in range(4))
+
+# eBay item specifics and the ProductData fields they are read from
+ITEM_SPECIFIC_KEYS = ('Artist', 'Medium', 'Size', 'Year', 'Edition', 'Condition')
+get_item_specifics = attrgetter('artist', 'medium', 'size', 'year', 'edition', 'condition')
+
+# Maximum number of products analyzed at the same time in batch mode
+BATCH_CONCURRENCY = 4
+
+
+async def query_model(model: str) -> str:
+    """Stand-in for the vision API request sent to a single model."""
+    await asyncio.sleep(0.2)
+    return model
+
+
+async def simulate_ai_analysis(product: ProductData) -> Dict:
     print_header(f"AI ANALYSIS: {product.sku}")
 
     if RICH_AVAILABLE:
         console.print(f"[dim]Processing: {product.artist} - {product.title}[/dim]\n")
 
-        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), console=console) as progress:
-            for model in ['GPT-4V', 'Claude', 'Gemini', 'Grok']:
-                task = progress.add_task(f"[cyan]{model} analyzing...", total=None)
-                time.sleep(0.2)
-                progress.remove_task(task)
+        with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"),
+                      console=console, transient=True) as progress:
+            task = progress.add_task("[cyan]AI models analyzing...", total=len(AI_MODELS))
+            # The models are independent, so query them concurrently
+            for finished in asyncio.as_completed([query_model(model) for model in AI_MODELS]):
+                model = await finished
+                progress.update(task, advance=1, description=f"[cyan]{model} finished...")
 
         table = Table(title="🤖 AI Analysis Results", box=box.ROUNDED)
         table.add_column("AI Model", style="cyan")
         table.add_column("Finding")
         table.add_column("Confidence", justify="center")
 
-        findings = [
-            ("GPT-4V", "Limited edition print, authentic signature", "[green]96%[/green]"),
-            ("Claude", "Style matches known artist catalog", "[green]94%[/green]"),
-            ("Gemini", "Condition excellent, no restoration", "[green]92%[/green]"),
-            ("Grok", "Market value aligned with recent sales", "[yellow]87%[/yellow]"),
-        ]
-        for model, finding, conf in findings:
-            table.add_row(model, finding, conf)
+        for row in AI_FINDING_ROWS:
+            table.add_row(*row)
         console.print(table)
     else:
         print(f"Analyzing: {product.artist} - {product.title}")
 
+    return build_analysis(product)
+
+
+def suggest_price_range(price: float) -> Tuple[float, float]:
+    return (price * PRICE_RANGE_LOW, price * PRICE_RANGE_HIGH)
+
+
+@lru_cache(maxsize=1024)
+def build_analysis(product: ProductData) -> Dict:
+    """Analysis result for a product; cached, so callers must not mutate it."""
     return {
         'artwork_type': 'Limited Edition Print',
         'style': 'Contemporary Street Art',
         'market_position': 'High demand',
-        'suggested_price_range': (product.price * 0.9, product.price * 1.2)
+        'suggested_price_range': suggest_price_range(product.price)
     }
 
 
-def generate_listing(product: ProductData, analysis: Dict) -> Dict:
-    print_header("GENERATING LISTING")
-
-    listing = {
+def build_listing(product: ProductData, analysis: Dict) -> Dict:
+    return {
         'sku': product.sku,
         'title': f"{product.artist} - {product.title} {product.medium} {product.year}",
         'price': {'value': str(product.price), 'currency': 'USD'},
-        'item_specifics': {
-            'Artist': product.artist, 'Medium': product.medium,
-            'Size': product.size, 'Year': product.year,
-            'Edition': product.edition, 'Condition': product.condition
-        },
-        'images': [f"{product.sku}_{i}.jpg" for i in range(4)]
+        'item_specifics': dict(zip(ITEM_SPECIFIC_KEYS, get_item_specifics(product))),
+        'images': [product.sku + suffix for suffix in IMAGE_SUFFIXES]
     }
 
-    if RICH_AVAILABLE:
-        low, high = analysis['suggested_price_range']
-        price_panel = f"""
-[bold]Suggested Price:[/bold] [bold green]${product.price:.2f}[/bold green]
 
-[dim]Market Analysis:[/dim]
-  Low estimate:  ${low:.2f}
-  High estimate: ${high:.2f}
+def generate_listing(product: ProductData, analysis: Dict) -> Dict:
+    print_header("GENERATING LISTING")
 
-[dim]Pricing factors:[/dim]
-  • Artist demand:  [cyan]████████░░[/cyan] High
-  • Condition:      [green]██████████[/green] {product.condition}
-  • Edition rarity: [yellow]███████░░░[/yellow] {product.edition}
-"""
+    listing = build_listing(product, analysis)
+
+    if RICH_AVAILABLE:
+        low, high = analysis['suggested_price_range']
+        price_panel = PRICE_PANEL_TEMPLATE.substitute(
+            price=f"{product.price:.2f}", low=f"{low:.2f}", high=f"{high:.2f}",
+            condition=product.condition, edition=product.edition,
+        )
         console.print(Panel(price_panel, title="💰 Price Analysis", border_style="green", box=box.ROUNDED))
 
         table = Table(title="📋 Item Specifics", box=box.ROUNDED)
@@ -166,7 +246,7 @@ def generate_listing(product: ProductData, analysis: Dict) -> Dict:
     return listing
 
 
-def simulate_upload(listing: Dict) -> None:
+async def simulate_upload(listing: Dict) -> None:
     print_header("eBay UPLOAD SIMULATION")
 
     if RICH_AVAILABLE:
@@ -175,7 +255,7 @@ def simulate_upload(listing: Dict) -> None:
             task = progress.add_task("[cyan]Uploading...", total=100)
             for step in ["Validating...", "Uploading images...", "Creating listing...", "Publishing..."]:
                 progress.update(task, advance=25, description=f"[cyan]{step}")
-                time.sleep(0.2)
+                await asyncio.sleep(0.2)
 
         result = Panel(f"""
 [bold green]✓ LISTING CREATED[/bold green]
@@ -190,13 +270,40 @@ def simulate_upload(listing: Dict) -> None:
         print("  Listing ID: 123456789012")
 
 
+async def process_product(product: ProductData, semaphore: asyncio.Semaphore) -> Dict:
+    """Analyze a product and build its listing without console output."""
+    async with semaphore:
+        await asyncio.gather(*(query_model(model) for model in AI_MODELS))
+        return build_listing(product, build_analysis(product))
+
+
+async def process_batch(products: List[ProductData],
+                        on_done: Optional[Callable[[ProductData], None]] = None) -> List[Dict]:
+    """Process products concurrently, at most BATCH_CONCURRENCY at a time."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(product: ProductData) -> Dict:
+        listing = await process_product(product, semaphore)
+        if on_done:
+            on_done(product)
+        return listing
+
+    return list(await asyncio.gather(*(run(p) for p in products)))
+
+
 def save_outputs(listings: List[Dict]) -> Path:
     print_header("SAVING OUTPUT")
     output_dir = Path("demo_output")
-    output_dir.mkdir(exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
-    with open(output_dir / "listings.json", "w") as f:
-        json.dump(listings, f, indent=2)
+    # One JSON document per line, so only one listing is encoded at a time
+    with open(output_dir / "listings.jsonl", "wb") as f:
+        for listing in listings:
+            if ORJSON_AVAILABLE:
+                f.write(orjson.dumps(listing))
+            else:
+                f.write(json.dumps(listing).encode())
+            f.write(b"\n")
 
     if RICH_AVAILABLE:
         console.print(f"[bold green]✓[/bold green] Saved {len(listings)} listing(s) to [cyan]{output_dir}/[/cyan]")
@@ -275,7 +382,7 @@ def show_batch_results() -> None:
         console.print(Panel(stats, title="📈 Analytics", border_style="gold1", box=box.ROUNDED))
 
 
-def main() -> None:
+async def main() -> None:
     show_banner()
 
     if RICH_AVAILABLE:
@@ -292,20 +399,24 @@ def main() -> None:
     if RICH_AVAILABLE:
         console.print(Panel(f"[bold]{product.title}[/bold]\nby {product.artist}", title="🎨 Processing Item 1/8", border_style="gold1"))
 
-    analysis = simulate_ai_analysis(product)
+    analysis = await simulate_ai_analysis(product)
     listing = generate_listing(product, analysis)
-    simulate_upload(listing)
+    await simulate_upload(listing)
     listings.append(listing)
 
-    # Simulate processing remaining items quickly
+    # Process remaining items concurrently
+    remaining = SAMPLE_INVENTORY[1:]
     if RICH_AVAILABLE:
         print_header("PROCESSING REMAINING ITEMS")
         with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"),
                       BarColumn(), TextColumn("[progress.percentage]{task.percentage:>3.0f}%"), console=console) as progress:
-            task = progress.add_task("[cyan]Processing batch...", total=len(SAMPLE_INVENTORY) - 1)
-            for p in SAMPLE_INVENTORY[1:]:
-                time.sleep(0.3)
-                progress.update(task, advance=1, description=f"[cyan]{p.sku}...")
+            task = progress.add_task("[cyan]Processing batch...", total=len(remaining))
+            listings.extend(await process_batch(
+                remaining,
+                lambda p: progress.update(task, advance=1, description=f"[cyan]{p.sku}..."),
+            ))
+    else:
+        listings.extend(await process_batch(remaining))
 
     # Show batch results
     show_batch_results()
@@ -329,4 +440,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
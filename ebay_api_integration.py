@@ -4,119 +4,293 @@ eBay API Integration for Gauntlet Gallery
 Handles authentication, listing creation, and inventory management
 """
 
+import atexit
+import logging
 import os
 import json
 import base64
+import hashlib
+import tempfile
+import threading
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Sequence
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson is optional; fall back to the stdlib encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+EBAY_CREDENTIALS = {
+    'app_id': os.getenv('EBAY_APP_ID', ''),
+    'cert_id': os.getenv('EBAY_CERT_ID', ''),
+    'dev_id': os.getenv('EBAY_DEV_ID', ''),
+    'redirect_uri': os.getenv('EBAY_REDIRECT_URI', ''),
+    'environment': os.getenv('EBAY_ENVIRONMENT', 'sandbox')
+}
+
+# API endpoints
+SANDBOX_ENDPOINTS = MappingProxyType({
+    'oauth': 'https://api.sandbox.ebay.com/identity/v1/oauth2/token',
+    'sell_inventory': 'https://api.sandbox.ebay.com/sell/inventory/v1',
+    'sell_account': 'https://api.sandbox.ebay.com/sell/account/v1',
+    'sell_marketing': 'https://api.sandbox.ebay.com/sell/marketing/v1',
+    'sell_feed': 'https://api.sandbox.ebay.com/sell/feed/v1',
+    'browse': 'https://api.sandbox.ebay.com/buy/browse/v1'
+})
+
+PRODUCTION_ENDPOINTS = MappingProxyType({
+    'oauth': 'https://api.ebay.com/identity/v1/oauth2/token',
+    'sell_inventory': 'https://api.ebay.com/sell/inventory/v1',
+    'sell_account': 'https://api.ebay.com/sell/account/v1',
+    'sell_marketing': 'https://api.ebay.com/sell/marketing/v1',
+    'sell_feed': 'https://api.ebay.com/sell/feed/v1',
+    'browse': 'https://api.ebay.com/buy/browse/v1'
+})
+
+# OAuth tokens are persisted here between runs (owner-readable only)
+TOKENS_FILE = '.ebay_tokens.json'
+
+# Refreshed tokens are written to disk at most this often (and at exit)
+TOKEN_SAVE_DELAY_SECONDS = 5.0
+
+# Refresh access tokens this long (or 10% of their lifetime, if longer) before they expire
+TOKEN_REFRESH_BUFFER_SECONDS = 300
+
+# Upper bound on in-flight eBay API requests during batch operations
+MAX_CONCURRENT_REQUESTS = 10
+
+# Keep-alive connections held per host; batch workers beyond this would open throwaway connections
+CONNECTION_POOL_SIZE = MAX_CONCURRENT_REQUESTS * 2
+
+OAUTH_SCOPES = (
+    'https://api.ebay.com/oauth/api_scope',
+    'https://api.ebay.com/oauth/api_scope/sell.inventory',
+    'https://api.ebay.com/oauth/api_scope/sell.marketing',
+    'https://api.ebay.com/oauth/api_scope/sell.account'
+)
+
+# Internal condition grades mapped to eBay condition enum values
+EBAY_CONDITIONS = MappingProxyType({
+    'mint': 'NEW',
+    'excellent': 'LIKE_NEW',
+    'very good': 'VERY_GOOD',
+    'good': 'GOOD',
+    'fair': 'ACCEPTABLE'
+})
+
+# eBay condition enum values as the numeric ConditionIDs used by File Exchange feeds
+EBAY_CONDITION_IDS = MappingProxyType({
+    'NEW': 1000,
+    'LIKE_NEW': 2750,
+    'VERY_GOOD': 4000,
+    'GOOD': 5000,
+    'ACCEPTABLE': 6000
+})
+
+# Listing images: absolute URLs pass through, local paths are served from IMAGE_HOST
+MAX_LISTING_IMAGES = 12
+URL_SCHEMES = ('http://', 'https://')
+IMAGE_HOST = 'https://your-domain.com'
+PLACEHOLDER_IMAGE_URL = 'https://via.placeholder.com/800x600/f0f0f0/333333?text=Artwork+Image'
+PLACEHOLDER_IMAGE_URLS = (PLACEHOLDER_IMAGE_URL,)
+
+# Static HTML for listing descriptions; only the artwork fields vary per product
+LISTING_DESCRIPTION_TEMPLATE = """
+<div style="font-family: Arial, sans-serif; max-width: 800px;">
+    <h2>{artist} - {title}</h2>
+    
+    <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3>🎨 Artwork Details</h3>
+        <ul>
+            <li><strong>Artist:</strong> {artist}</li>
+            <li><strong>Title:</strong> {title}</li>
+            <li><strong>Medium:</strong> {medium}</li>
+            <li><strong>Size:</strong> {size}</li>
+            <li><strong>Year:</strong> {year}</li>
+            <li><strong>Condition:</strong> {condition}</li>
+        </ul>
+    </div>
+    
+    <div style="background: #e8f5e8; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3>🏆 About Gauntlet Gallery</h3>
+        <p>Professional art dealers specializing in contemporary and modern artwork. 
+        All pieces are carefully curated and authenticated. We provide detailed 
+        condition reports and provenance information.</p>
+        
+        <p><strong>Why Choose Gauntlet Gallery?</strong></p>
+        <ul>
+            <li>✅ Professional authentication</li>
+            <li>✅ Detailed condition reports</li>
+            <li>✅ Secure packaging & shipping</li>
+            <li>✅ 30-day return policy</li>
+            <li>✅ Certificate of authenticity available</li>
+        </ul>
+    </div>
+    
+    <div style="background: #fff3cd; padding: 15px; border-radius: 8px; margin: 15px 0;">
+        <h3>📦 Shipping & Handling</h3>
+        <p>This artwork will be carefully packaged with museum-quality materials 
+        to ensure it arrives in perfect condition. We ship worldwide with tracking 
+        and insurance included.</p>
+    </div>
+    
+    <p style="text-align: center; margin-top: 20px;">
+        <em>Thank you for considering this beautiful piece for your collection!</em>
+    </p>
+</div>
+""".strip()
+
+
+def json_dumps(data: Any, indent: bool = False) -> bytes:
+    """Encode data as UTF-8 JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(data, indent=2 if indent else None).encode()
+
+
+def json_loads(data: bytes) -> Any:
+    """Decode JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class eBayAPIIntegration:
     """eBay API integration for automated art listings"""
 
     def __init__(self):
         """Initialize eBay API with credentials from environment"""
 
-        # Load credentials from environment variables
-        self.credentials = {
-            'app_id': os.getenv('EBAY_APP_ID', ''),
-            'cert_id': os.getenv('EBAY_CERT_ID', ''),
-            'dev_id': os.getenv('EBAY_DEV_ID', ''),
-            'redirect_uri': os.getenv('EBAY_REDIRECT_URI', ''),
-            'environment': os.getenv('EBAY_ENVIRONMENT', 'sandbox')
-        }
+        # Credentials are read from the environment once, at import
+        self.credentials = dict(EBAY_CREDENTIALS)
         
         # API endpoints
-        self.sandbox_endpoints = {
-            'oauth': 'https://api.sandbox.ebay.com/identity/v1/oauth2/token',
-            'sell_inventory': 'https://api.sandbox.ebay.com/sell/inventory/v1',
-            'sell_account': 'https://api.sandbox.ebay.com/sell/account/v1',
-            'sell_marketing': 'https://api.sandbox.ebay.com/sell/marketing/v1',
-            'browse': 'https://api.sandbox.ebay.com/buy/browse/v1'
-        }
+        self.sandbox_endpoints = SANDBOX_ENDPOINTS
+        self.production_endpoints = PRODUCTION_ENDPOINTS
+        
+        self.endpoints = self.sandbox_endpoints if self.credentials['environment'] == 'sandbox' else self.production_endpoints
         
-        self.production_endpoints = {
-            'oauth': 'https://api.ebay.com/identity/v1/oauth2/token',
-            'sell_inventory': 'https://api.ebay.com/sell/inventory/v1',
-            'sell_account': 'https://api.ebay.com/sell/account/v1',
-            'sell_marketing': 'https://api.ebay.com/sell/marketing/v1',
-            'browse': 'https://api.ebay.com/buy/browse/v1'
+        # OAuth token requests use Basic auth with the app credentials, which never change
+        credentials = f"{self.credentials['app_id']}:{self.credentials['cert_id']}"
+        self._oauth_headers = {
+            'Authorization': f'Basic {base64.b64encode(credentials.encode()).decode()}',
+            'Content-Type': 'application/x-www-form-urlencoded'
         }
         
-        self.endpoints = self.sandbox_endpoints if self.credentials['environment'] == 'sandbox' else self.production_endpoints
+        # Content hash of the last inventory item successfully stored per SKU
+        self._inventory_item_digests = {}
+        
+        # Built on first use by get_auth_url
+        self._auth_url = None
+        
+        # Bearer headers for REST calls, rebuilt by _api_headers when the access token changes
+        self._api_headers_token = None
+        self._api_headers_cache = {}
+        
+        # Pooled keep-alive connections shared by every API call
+        self.session = self._create_session()
         
         # Authentication
         self.access_token = None
         self.refresh_token = None
         self.token_expires_at = None
+        # time.monotonic() deadlines used for the per-call validity check
+        self._refresh_at_mono = None
+        self._expires_at_mono = None
+        
+        # Refreshed tokens are persisted in the background by _flush_tokens; the
+        # exit hook is only registered while a save is pending, so idle clients
+        # are not kept alive by atexit
+        self._tokens_lock = threading.Lock()
+        self._tokens_dirty = False
+        self._token_save_timer = None
+        
+        # Saved tokens are read once here and served from memory afterwards
+        self._load_tokens()
         
-        print(f"🛒 eBay API Integration initialized for {self.credentials['environment']} environment")
+        logger.info("eBay API Integration initialized for %s environment", self.credentials['environment'])
+    
+    def _api_headers(self) -> Dict[str, str]:
+        """Headers for REST API calls with the current access token"""
+        if self._api_headers_token != self.access_token:
+            self._api_headers_cache = {
+                'Authorization': f'Bearer {self.access_token}',
+                'Content-Type': 'application/json',
+                'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US'
+            }
+            self._api_headers_token = self.access_token
+        return self._api_headers_cache
+    
+    def _create_session(self) -> requests.Session:
+        """Create an HTTP session that reuses connections to the eBay API"""
+        session = requests.Session()
+        # Retry transient failures; urllib3 only retries idempotent methods, so POSTs are not replayed.
+        # Once retries run out, hand back the last response instead of raising RetryError
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=CONNECTION_POOL_SIZE, max_retries=retry)
+        session.mount('https://', adapter)
+        return session
     
     def get_auth_url(self) -> str:
         """Generate eBay OAuth authorization URL"""
-        base_url = "https://auth.sandbox.ebay.com/oauth2/authorize" if self.credentials['environment'] == 'sandbox' else "https://auth.ebay.com/oauth2/authorize"
-        
-        scopes = [
-            'https://api.ebay.com/oauth/api_scope',
-            'https://api.ebay.com/oauth/api_scope/sell.inventory',
-            'https://api.ebay.com/oauth/api_scope/sell.marketing',
-            'https://api.ebay.com/oauth/api_scope/sell.account'
-        ]
-        
-        auth_url = (
-            f"{base_url}?"
-            f"client_id={self.credentials['app_id']}&"
-            f"redirect_uri={self.credentials['redirect_uri']}&"
-            f"response_type=code&"
-            f"scope={' '.join(scopes)}"
-        )
+        # The URL only depends on the client's credentials, so build it once
+        if self._auth_url is None:
+            base_url = "https://auth.sandbox.ebay.com/oauth2/authorize" if self.credentials['environment'] == 'sandbox' else "https://auth.ebay.com/oauth2/authorize"
+            
+            self._auth_url = (
+                f"{base_url}?"
+                f"client_id={self.credentials['app_id']}&"
+                f"redirect_uri={self.credentials['redirect_uri']}&"
+                f"response_type=code&"
+                f"scope={' '.join(OAUTH_SCOPES)}"
+            )
         
-        return auth_url
+        return self._auth_url
     
     def exchange_code_for_token(self, auth_code: str) -> Dict[str, Any]:
         """Exchange authorization code for access token"""
         try:
-            # Create authorization header
-            credentials = f"{self.credentials['app_id']}:{self.credentials['cert_id']}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            
-            headers = {
-                'Authorization': f'Basic {encoded_credentials}',
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            
             data = {
                 'grant_type': 'authorization_code',
                 'code': auth_code,
                 'redirect_uri': self.credentials['redirect_uri']
             }
             
-            response = requests.post(self.endpoints['oauth'], headers=headers, data=data)
+            response = self.session.post(self.endpoints['oauth'], headers=self._oauth_headers, data=data)
             
             if response.status_code == 200:
-                token_data = response.json()
+                token_data = json_loads(response.content)
                 
                 self.access_token = token_data['access_token']
                 self.refresh_token = token_data.get('refresh_token')
-                expires_in = token_data.get('expires_in', 7200)  # Default 2 hours
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self._set_token_expiry(token_data.get('expires_in', 7200))  # Default 2 hours
                 
                 # Save tokens
                 self._save_tokens()
                 
-                print("✅ eBay OAuth tokens obtained successfully")
+                logger.info("eBay OAuth tokens obtained successfully")
                 return token_data
             else:
-                print(f"❌ eBay OAuth failed: {response.status_code} - {response.text}")
+                logger.error("eBay OAuth failed: %s - %s", response.status_code, response.text)
                 return {}
                 
         except Exception as e:
-            print(f"❌ eBay OAuth error: {str(e)}")
+            logger.error("eBay OAuth error: %s", e)
             return {}
     
     def refresh_access_token(self) -> bool:
@@ -125,81 +299,108 @@ class eBayAPIIntegration:
             return False
             
         try:
-            credentials = f"{self.credentials['app_id']}:{self.credentials['cert_id']}"
-            encoded_credentials = base64.b64encode(credentials.encode()).decode()
-            
-            headers = {
-                'Authorization': f'Basic {encoded_credentials}',
-                'Content-Type': 'application/x-www-form-urlencoded'
-            }
-            
             data = {
                 'grant_type': 'refresh_token',
                 'refresh_token': self.refresh_token
             }
             
-            response = requests.post(self.endpoints['oauth'], headers=headers, data=data)
+            response = self.session.post(self.endpoints['oauth'], headers=self._oauth_headers, data=data)
             
             if response.status_code == 200:
-                token_data = response.json()
+                token_data = json_loads(response.content)
                 self.access_token = token_data['access_token']
-                expires_in = token_data.get('expires_in', 7200)
-                self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+                self._set_token_expiry(token_data.get('expires_in', 7200))
                 
-                self._save_tokens()
-                print("✅ eBay access token refreshed")
+                self._schedule_token_save()
+                logger.info("eBay access token refreshed")
                 return True
             else:
-                print(f"❌ eBay token refresh failed: {response.status_code}")
+                logger.error("eBay token refresh failed: %s", response.status_code)
                 return False
                 
         except Exception as e:
-            print(f"❌ eBay token refresh error: {str(e)}")
+            logger.error("eBay token refresh error: %s", e)
             return False
     
+    def _set_token_expiry(self, expires_in: int):
+        """Record when the current access token expires and how early to refresh it"""
+        now = time.monotonic()
+        self.token_expires_at = int(time.time() + expires_in)  # Unix timestamp, persisted as-is
+        self._expires_at_mono = now + expires_in
+        self._refresh_at_mono = self._expires_at_mono - max(TOKEN_REFRESH_BUFFER_SECONDS, expires_in // 10)
+    
+    def _schedule_token_save(self):
+        """Mark tokens as changed and write them to disk shortly, coalescing rapid refreshes"""
+        with self._tokens_lock:
+            self._tokens_dirty = True
+            if self._token_save_timer is None:
+                self._token_save_timer = threading.Timer(TOKEN_SAVE_DELAY_SECONDS, self._flush_tokens)
+                self._token_save_timer.daemon = True
+                self._token_save_timer.start()
+                atexit.register(self._flush_tokens)
+    
+    def _flush_tokens(self):
+        """Write pending token changes to disk"""
+        with self._tokens_lock:
+            if self._token_save_timer is not None:
+                self._token_save_timer.cancel()
+                self._token_save_timer = None
+                atexit.unregister(self._flush_tokens)
+            if self._tokens_dirty:
+                self._save_tokens()
+                self._tokens_dirty = False
+    
     def _save_tokens(self):
         """Save tokens to file"""
         token_data = {
             'access_token': self.access_token,
             'refresh_token': self.refresh_token,
-            'expires_at': self.token_expires_at.isoformat() if self.token_expires_at else None,
+            'expires_at': self.token_expires_at,
             'environment': self.credentials['environment']
         }
         
-        with open('.ebay_tokens.json', 'w') as f:
-            json.dump(token_data, f, indent=2)
+        # Write to a private temp file and atomically swap it in, so readers in
+        # other processes never see a partially written token file
+        fd, tmp_path = tempfile.mkstemp(prefix='.ebay_tokens.', suffix='.tmp', dir='.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(json_dumps(token_data, indent=True))
+            os.replace(tmp_path, TOKENS_FILE)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
     
     def _load_tokens(self):
         """Load saved tokens"""
         try:
-            if os.path.exists('.ebay_tokens.json'):
-                with open('.ebay_tokens.json', 'r') as f:
-                    token_data = json.load(f)
+            if os.path.exists(TOKENS_FILE):
+                with open(TOKENS_FILE, 'rb') as f:
+                    token_data = json_loads(f.read())
                 
                 self.access_token = token_data.get('access_token')
                 self.refresh_token = token_data.get('refresh_token')
                 
-                if token_data.get('expires_at'):
-                    self.token_expires_at = datetime.fromisoformat(token_data['expires_at'])
+                expires_at = token_data.get('expires_at')
+                if isinstance(expires_at, str):
+                    # Token files written by older versions store an ISO timestamp
+                    expires_at = datetime.fromisoformat(expires_at).timestamp()
+                if expires_at:
+                    self._set_token_expiry(int(expires_at - time.time()))
                 
                 return True
         except Exception as e:
-            print(f"⚠️ Could not load eBay tokens: {str(e)}")
+            logger.warning("Could not load eBay tokens: %s", e)
         
         return False
     
     def ensure_valid_token(self) -> bool:
         """Ensure we have a valid access token"""
-        # Load existing tokens
-        if not self.access_token:
-            self._load_tokens()
-        
-        # Check if token is expired
-        if self.token_expires_at and datetime.now() >= self.token_expires_at:
-            if self.refresh_token:
-                return self.refresh_access_token()
-            else:
-                return False
+        # Refresh ahead of expiry so in-flight requests don't hit a 401
+        if self._refresh_at_mono is not None and time.monotonic() >= self._refresh_at_mono:
+            if self.refresh_token and self.refresh_access_token():
+                return True
+            # Without a successful refresh, the current token is usable until it actually expires
+            return bool(self.access_token) and time.monotonic() < self._expires_at_mono
         
         return bool(self.access_token)
     
@@ -209,12 +410,6 @@ class eBayAPIIntegration:
             return {'success': False, 'error': 'No valid eBay token'}
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json',
-                'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US'
-            }
-            
             # Convert product data to eBay format
             ebay_item = self._convert_to_ebay_format(product_data)
             
@@ -222,18 +417,24 @@ class eBayAPIIntegration:
             sku = product_data.get('sku', f"ART-{int(time.time())}")
             url = f"{self.endpoints['sell_inventory']}/inventory_item/{sku}"
             
-            response = requests.put(url, headers=headers, json=ebay_item)
-            
-            if response.status_code in [200, 201, 204]:
-                print(f"✅ eBay inventory item created: {sku}")
+            # Skip the PUT when this exact item was already stored for the SKU (retries, re-runs)
+            body = json_dumps(ebay_item)
+            digest = hashlib.blake2b(body, digest_size=16).digest()
+            if self._inventory_item_digests.get(sku) == digest:
+                logger.info("eBay inventory item unchanged, skipping upload: %s", sku)
                 return {'success': True, 'sku': sku, 'item_data': ebay_item}
-            else:
-                error_msg = self._parse_ebay_error(response)
-                print(f"❌ eBay inventory creation failed: {error_msg}")
-                return {'success': False, 'error': error_msg}
+            
+            response = self.session.put(url, headers=self._api_headers(), data=body)
+            result = self._handle_response(response, (200, 201, 204),
+                                           lambda data: {'sku': sku, 'item_data': ebay_item},
+                                           'inventory creation')
+            if result['success']:
+                self._inventory_item_digests[sku] = digest
+                logger.info("eBay inventory item created: %s", sku)
+            return result
                 
         except Exception as e:
-            print(f"❌ eBay inventory creation error: {str(e)}")
+            logger.error("eBay inventory creation error: %s", e)
             return {'success': False, 'error': str(e)}
     
     def create_offer(self, sku: str, price: float, quantity: int = 1) -> Dict[str, Any]:
@@ -242,12 +443,6 @@ class eBayAPIIntegration:
             return {'success': False, 'error': 'No valid eBay token'}
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json',
-                'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US'
-            }
-            
             offer_data = {
                 'sku': sku,
                 'marketplaceId': 'EBAY_US',
@@ -269,20 +464,17 @@ class eBayAPIIntegration:
             }
             
             url = f"{self.endpoints['sell_inventory']}/offer"
-            response = requests.post(url, headers=headers, json=offer_data)
+            response = self.session.post(url, headers=self._api_headers(), data=json_dumps(offer_data))
             
-            if response.status_code in [200, 201]:
-                offer_response = response.json()
-                offer_id = offer_response.get('offerId')
-                print(f"✅ eBay offer created: {offer_id}")
-                return {'success': True, 'offer_id': offer_id, 'sku': sku}
-            else:
-                error_msg = self._parse_ebay_error(response)
-                print(f"❌ eBay offer creation failed: {error_msg}")
-                return {'success': False, 'error': error_msg}
+            result = self._handle_response(response, (200, 201),
+                                           lambda data: {'offer_id': data.get('offerId'), 'sku': sku},
+                                           'offer creation')
+            if result['success']:
+                logger.info("eBay offer created: %s", result['offer_id'])
+            return result
                 
         except Exception as e:
-            print(f"❌ eBay offer creation error: {str(e)}")
+            logger.error("eBay offer creation error: %s", e)
             return {'success': False, 'error': str(e)}
     
     def publish_offer(self, offer_id: str) -> Dict[str, Any]:
@@ -291,29 +483,55 @@ class eBayAPIIntegration:
             return {'success': False, 'error': 'No valid eBay token'}
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json',
-                'X-EBAY-C-MARKETPLACE-ID': 'EBAY_US'
-            }
-            
             url = f"{self.endpoints['sell_inventory']}/offer/{offer_id}/publish"
-            response = requests.post(url, headers=headers)
+            response = self.session.post(url, headers=self._api_headers())
             
-            if response.status_code in [200, 204]:
-                publish_response = response.json() if response.text else {}
-                listing_id = publish_response.get('listingId')
-                print(f"✅ eBay listing published: {listing_id}")
-                return {'success': True, 'listing_id': listing_id, 'offer_id': offer_id}
-            else:
-                error_msg = self._parse_ebay_error(response)
-                print(f"❌ eBay publishing failed: {error_msg}")
-                return {'success': False, 'error': error_msg}
+            result = self._handle_response(response, (200, 204),
+                                           lambda data: {'listing_id': data.get('listingId'),
+                                                         'offer_id': offer_id},
+                                           'publishing')
+            if result['success']:
+                logger.info("eBay listing published: %s", result['listing_id'])
+            return result
                 
         except Exception as e:
-            print(f"❌ eBay publishing error: {str(e)}")
+            logger.error("eBay publishing error: %s", e)
             return {'success': False, 'error': str(e)}
     
+    def list_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the inventory item and offer for a product, then publish it as a live listing"""
+        offer_result = self._create_inventory_and_offer(product_data)
+        if not offer_result.get('success'):
+            return offer_result
+        
+        publish_result = self.publish_offer(offer_result['offer_id'])
+        if publish_result.get('success'):
+            publish_result['sku'] = offer_result['sku']
+        return publish_result
+    
+    def create_listings_batch(self, products: List[Dict[str, Any]],
+                              max_concurrency: int = MAX_CONCURRENT_REQUESTS) -> List[Dict[str, Any]]:
+        """Create inventory items and offers for many products concurrently"""
+        # Refresh once up front so worker threads don't race to refresh the token
+        if not self.ensure_valid_token():
+            return [{'success': False, 'error': 'No valid eBay token'} for _ in products]
+        
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, CONNECTION_POOL_SIZE)) as executor:
+            return list(executor.map(self._create_inventory_and_offer, products))
+    
+    def _create_inventory_and_offer(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create the inventory item and offer for a single product"""
+        inventory_result = self.create_inventory_item(product_data)
+        if not inventory_result.get('success'):
+            return inventory_result
+        
+        price = float(product_data.get('sale_price', 100))
+        return self.create_offer(inventory_result['sku'], price)
+    
+    def build_inventory_item(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """eBay inventory item (condition, description, images) for a product, without uploading it"""
+        return self._convert_to_ebay_format(product_data)
+    
     def _convert_to_ebay_format(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """Convert product data to eBay inventory item format"""
         
@@ -326,53 +544,14 @@ class eBayAPIIntegration:
         year = product_data.get('year', '2024')
         
         # Create eBay-compatible title (80 char limit)
-        ebay_title = f"{artist} - {title}"[:77] + "..." if len(f"{artist} - {title}") > 80 else f"{artist} - {title}"
+        ebay_title = f"{artist} - {title}"
+        if len(ebay_title) > 80:
+            ebay_title = ebay_title[:77] + "..."
         
         # Create detailed description
-        description = f"""
-<div style="font-family: Arial, sans-serif; max-width: 800px;">
-    <h2>{artist} - {title}</h2>
-    
-    <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3>🎨 Artwork Details</h3>
-        <ul>
-            <li><strong>Artist:</strong> {artist}</li>
-            <li><strong>Title:</strong> {title}</li>
-            <li><strong>Medium:</strong> {medium}</li>
-            <li><strong>Size:</strong> {size}</li>
-            <li><strong>Year:</strong> {year}</li>
-            <li><strong>Condition:</strong> {condition}</li>
-        </ul>
-    </div>
-    
-    <div style="background: #e8f5e8; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3>🏆 About Gauntlet Gallery</h3>
-        <p>Professional art dealers specializing in contemporary and modern artwork. 
-        All pieces are carefully curated and authenticated. We provide detailed 
-        condition reports and provenance information.</p>
-        
-        <p><strong>Why Choose Gauntlet Gallery?</strong></p>
-        <ul>
-            <li>✅ Professional authentication</li>
-            <li>✅ Detailed condition reports</li>
-            <li>✅ Secure packaging & shipping</li>
-            <li>✅ 30-day return policy</li>
-            <li>✅ Certificate of authenticity available</li>
-        </ul>
-    </div>
-    
-    <div style="background: #fff3cd; padding: 15px; border-radius: 8px; margin: 15px 0;">
-        <h3>📦 Shipping & Handling</h3>
-        <p>This artwork will be carefully packaged with museum-quality materials 
-        to ensure it arrives in perfect condition. We ship worldwide with tracking 
-        and insurance included.</p>
-    </div>
-    
-    <p style="text-align: center; margin-top: 20px;">
-        <em>Thank you for considering this beautiful piece for your collection!</em>
-    </p>
-</div>
-        """.strip()
+        description = LISTING_DESCRIPTION_TEMPLATE.format(
+            artist=artist, title=title, medium=medium, size=size, year=year, condition=condition
+        )
         
         # Product aspects (item specifics)
         aspects = {
@@ -412,51 +591,107 @@ class eBayAPIIntegration:
     
     def _map_condition_to_ebay(self, condition: str) -> str:
         """Map internal condition to eBay condition values"""
-        condition_map = {
-            'mint': 'NEW',
-            'excellent': 'LIKE_NEW',
-            'very good': 'VERY_GOOD',
-            'good': 'GOOD',
-            'fair': 'ACCEPTABLE'
-        }
-        
-        return condition_map.get(condition.lower(), 'GOOD')
+        return EBAY_CONDITIONS.get(condition.lower(), 'GOOD')
     
-    def _get_image_urls(self, product_data: Dict[str, Any]) -> List[str]:
+    def _get_image_urls(self, product_data: Dict[str, Any]) -> Sequence[str]:
         """Extract and format image URLs for eBay"""
-        images = []
-        
-        # Get photos from product data
-        photos = product_data.get('photos', [])
-        for photo in photos[:12]:  # eBay allows max 12 images
-            if photo.startswith('http'):
-                images.append(photo)
-            else:
-                # Convert local path to URL (you'll need to host these)
-                # For now, return placeholder
-                images.append(f"https://your-domain.com{photo}")
+        # eBay allows max 12 images; local paths need to be hosted (placeholder domain for now)
+        photos = product_data.get('photos', [])[:MAX_LISTING_IMAGES]
+        images = [photo if photo.startswith(URL_SCHEMES) else IMAGE_HOST + photo for photo in photos]
         
-        # If no images, add placeholder
-        if not images:
-            images.append("https://via.placeholder.com/800x600/f0f0f0/333333?text=Artwork+Image")
+        # If no images, use the shared (immutable) placeholder list
+        return images or PLACEHOLDER_IMAGE_URLS
+    
+    def _handle_response(self, response, success_codes, extract_fn, action: str) -> Dict[str, Any]:
+        """Turn an eBay API response into a result dict, parsing the body at most once"""
+        if response.status_code in success_codes:
+            data = json_loads(response.content) if response.content else {}
+            return {'success': True, **extract_fn(data)}
         
-        return images
+        error_msg = self._parse_ebay_error(response)
+        logger.error("eBay %s failed: %s", action, error_msg)
+        return {'success': False, 'error': error_msg}
     
     def _parse_ebay_error(self, response) -> str:
         """Parse eBay API error response"""
+        # Only JSON bodies carry eBay's structured errors; don't try to parse HTML/text error pages
+        if 'json' in response.headers.get('Content-Type', ''):
+            try:
+                error_data = json_loads(response.content)
+                if 'errors' in error_data:
+                    errors = []
+                    for error in error_data['errors']:
+                        message = error.get('message', 'Unknown error')
+                        error_id = error.get('errorId', '')
+                        errors.append(f"{message} ({error_id})" if error_id else message)
+                    return '; '.join(errors)
+            except Exception:
+                pass
+        
+        # Decode only the bytes we keep; error pages can be large HTML documents
+        snippet = response.content[:200].decode('utf-8', errors='replace')
+        return f"HTTP {response.status_code}: {snippet}"
+    
+    def create_feed_task(self, feed_type: str, schema_version: str) -> Dict[str, Any]:
+        """Create a Sell Feed API upload task"""
+        if not self.ensure_valid_token():
+            return {'success': False, 'error': 'No valid eBay token'}
+        
         try:
-            error_data = response.json()
-            if 'errors' in error_data:
-                errors = []
-                for error in error_data['errors']:
-                    message = error.get('message', 'Unknown error')
-                    error_id = error.get('errorId', '')
-                    errors.append(f"{message} ({error_id})" if error_id else message)
-                return '; '.join(errors)
-            else:
-                return f"HTTP {response.status_code}: {response.text[:200]}"
-        except:
-            return f"HTTP {response.status_code}: {response.text[:200]}"
+            url = f"{self.endpoints['sell_feed']}/task"
+            body = json_dumps({'feedType': feed_type, 'schemaVersion': schema_version})
+            response = self.session.post(url, headers=self._api_headers(), data=body)
+            
+            # The new task's ID is only returned as the last segment of the Location header
+            location = response.headers.get('Location', '')
+            return self._handle_response(response, (201, 202),
+                                         lambda data: {'task_id': location.rstrip('/').rsplit('/', 1)[-1]},
+                                         'feed task creation')
+                
+        except Exception as e:
+            logger.error("eBay feed task creation error: %s", e)
+            return {'success': False, 'error': str(e)}
+    
+    def upload_feed_file(self, task_id: str, file_name: str, content: bytes,
+                         content_type: str = 'text/csv') -> Dict[str, Any]:
+        """Upload the feed file for a Sell Feed API task"""
+        if not self.ensure_valid_token():
+            return {'success': False, 'error': 'No valid eBay token'}
+        
+        try:
+            url = f"{self.endpoints['sell_feed']}/task/{task_id}/upload_file"
+            # Multipart upload: let requests set the Content-Type (with its boundary)
+            headers = {k: v for k, v in self._api_headers().items() if k != 'Content-Type'}
+            response = self.session.post(
+                url, headers=headers,
+                data={'fileName': file_name, 'name': 'file', 'type': 'form-data'},
+                files={'file': (file_name, content, content_type)}
+            )
+            
+            return self._handle_response(response, (200, 202, 204),
+                                         lambda data: {'task_id': task_id}, 'feed upload')
+                
+        except Exception as e:
+            logger.error("eBay feed upload error: %s", e)
+            return {'success': False, 'error': str(e)}
+    
+    def get_feed_task(self, task_id: str) -> Dict[str, Any]:
+        """Get the status of a Sell Feed API task"""
+        if not self.ensure_valid_token():
+            return {'success': False, 'error': 'No valid eBay token'}
+        
+        try:
+            url = f"{self.endpoints['sell_feed']}/task/{task_id}"
+            response = self.session.get(url, headers=self._api_headers())
+            
+            return self._handle_response(response, (200,),
+                                         lambda data: {'task_id': task_id, 'status': data.get('status'),
+                                                       'task': data},
+                                         'feed task lookup')
+                
+        except Exception as e:
+            logger.error("eBay feed task lookup error: %s", e)
+            return {'success': False, 'error': str(e)}
     
     def get_account_info(self) -> Dict[str, Any]:
         """Get eBay account information"""
@@ -464,23 +699,18 @@ class eBayAPIIntegration:
             return {'success': False, 'error': 'No valid eBay token'}
         
         try:
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'application/json'
-            }
-            
             url = f"{self.endpoints['sell_account']}/fulfillment_policy"
-            response = requests.get(url, headers=headers)
+            response = self.session.get(url, headers=self._api_headers())
             
-            if response.status_code == 200:
-                return {'success': True, 'account_data': response.json()}
-            else:
-                return {'success': False, 'error': self._parse_ebay_error(response)}
+            return self._handle_response(response, (200,),
+                                         lambda data: {'account_data': data}, 'account lookup')
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     # Test eBay API integration
     ebay = eBayAPIIntegration()
     
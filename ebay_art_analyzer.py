@@ -7,12 +7,135 @@ Analyzes art images and generates complete eBay listings
 import os
 import json
 import base64
-import requests
+import csv
+import mmap
+import string
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from datetime import datetime
+from types import MappingProxyType
+from functools import lru_cache
+from itertools import chain, islice
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
-import hashlib
+from dataclasses import dataclass
+
+# orjson is optional; fall back to the stdlib encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Upper bound on images analyzed at once in batch_process (vision API calls are I/O bound)
+MAX_CONCURRENT_ANALYSES = 16
+
+# File extensions picked up by batch_process
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'})
+
+# eBay allows at most this many search tags per listing
+MAX_TAGS = 30
+
+# Tags added to every artwork listing
+GENERAL_TAGS = (
+    'art', 'artwork', 'original', 'handmade', 'wall art',
+    'home decor', 'collectible', 'fine art'
+)
+
+# Medium keyword -> eBay category, in the priority order used for substring matching
+MEDIUM_CATEGORIES = (
+    ('oil', (20125, "Art > Paintings > Oil Paintings")),
+    ('acrylic', (20126, "Art > Paintings > Acrylic Paintings")),
+    ('watercolor', (20127, "Art > Paintings > Watercolor Paintings")),
+    ('print', (360010003, "Art > Prints > Lithographs")),
+    ('lithograph', (360010003, "Art > Prints > Lithographs")),
+    ('photograph', (360010011, "Art > Photographs > Contemporary")),
+    ('drawing', (20130, "Art > Drawings > Pencil Drawings")),
+    ('pencil', (20130, "Art > Drawings > Pencil Drawings")),
+    ('sculpture', (553, "Art > Sculptures > Contemporary")),
+    ('digital', (360010016, "Art > Digital Art > Digital Prints")),
+)
+DEFAULT_CATEGORY = (20128, "Art > Paintings > Mixed Media")
+
+# eBay art categories mapping (read-only, shared by all analyzers)
+EBAY_ART_CATEGORIES = MappingProxyType({
+    'paintings': MappingProxyType({
+        'oil': 20125,
+        'acrylic': 20126,
+        'watercolor': 20127,
+        'mixed_media': 20128,
+        'pastel': 360010001,
+        'gouache': 360010002
+    }),
+    'prints': MappingProxyType({
+        'lithograph': 360010003,
+        'screenprint': 360010004,
+        'etching': 360010005,
+        'giclee': 360010006,
+        'woodblock': 360010007,
+        'offset_lithograph': 360010008
+    }),
+    'drawings': MappingProxyType({
+        'pencil': 20130,
+        'charcoal': 20131,
+        'ink': 20132,
+        'colored_pencil': 360010009,
+        'marker': 360010010
+    }),
+    'photographs': MappingProxyType({
+        'vintage': 360010011,
+        'contemporary': 360010012,
+        'digital': 360010013,
+        'film': 360010014
+    }),
+    'sculptures': MappingProxyType({
+        'bronze': 553,
+        'marble': 554,
+        'wood': 555,
+        'ceramic': 556,
+        'metal': 557,
+        'glass': 558
+    }),
+    'digital_art': MappingProxyType({
+        'nft': 360010015,
+        'digital_print': 360010016,
+        'ai_generated': 360010017
+    })
+})
+
+# Pricing guidelines based on artwork characteristics
+PRICING_DATABASE = MappingProxyType({
+    'size_multipliers': MappingProxyType({
+        'miniature': 0.5,
+        'small': 0.8,
+        'medium': 1.0,
+        'large': 1.5,
+        'oversized': 2.0
+    }),
+    'condition_multipliers': MappingProxyType({
+        'mint': 1.2,
+        'excellent': 1.0,
+        'very_good': 0.8,
+        'good': 0.6,
+        'fair': 0.4,
+        'poor': 0.2
+    }),
+    'medium_base_prices': MappingProxyType({
+        'oil_painting': 500,
+        'acrylic_painting': 350,
+        'watercolor': 250,
+        'print': 150,
+        'photograph': 200,
+        'drawing': 180,
+        'sculpture': 600,
+        'mixed_media': 400,
+        'digital': 100
+    }),
+    'authenticity_multipliers': MappingProxyType({
+        'signed': 1.5,
+        'numbered': 1.3,
+        'certificate': 2.0,
+        'provenance': 2.5
+    })
+})
 
 @dataclass
 class ArtworkAnalysis:
@@ -49,104 +172,221 @@ class EbayListing:
     return_policy: str
     payment_methods: List[str]
 
+# Listing description text around the authenticity markers
+DESCRIPTION_HEADER_TEMPLATE = """
+🎨 {title}
+
+ARTWORK DETAILS:
+━━━━━━━━━━━━━━━━━━━━━━━━
+• Medium: {medium}
+• Style: {style}
+• Period: {period}
+• Condition: {condition}
+• Size Category: {size_category}
+• Frame: {frame_info}
+
+DESCRIPTION:
+This captivating {style_lower} piece showcases {subject_lower}. 
+The artwork features a rich palette of {colors} tones, 
+creating a dynamic visual experience that commands attention.
+
+KEY FEATURES:
+✓ {medium} artwork in {condition_lower} condition
+✓ {signed}
+✓ {frame_info}
+✓ Perfect for collectors and art enthusiasts
+
+AUTHENTICITY:
+"""
+
+DESCRIPTION_FOOTER = """
+SHIPPING & HANDLING:
+• Carefully packaged with protective materials
+• Ships within 1-2 business days
+• Tracking number provided
+• International shipping available
+
+RETURNS:
+• 30-day return policy
+• Buyer pays return shipping
+• Item must be returned in original condition
+
+PAYMENT:
+• PayPal accepted
+• Immediate payment required for Buy It Now
+
+Please review all photos carefully and ask any questions before bidding.
+Thank you for viewing this exceptional artwork!
+"""
+
+# Listing preview page, parsed once; filled in by generate_html_preview
+HTML_PREVIEW_TEMPLATE = string.Template("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            max-width: 900px;
+            margin: 0 auto;
+            padding: 20px;
+            background: #f5f5f5;
+        }
+        .listing-container {
+            background: white;
+            border-radius: 8px;
+            padding: 30px;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+        }
+        h1 {
+            color: #333;
+            border-bottom: 3px solid #0064d2;
+            padding-bottom: 10px;
+        }
+        h2 {
+            color: #0064d2;
+            margin-top: 30px;
+        }
+        .price-info {
+            background: #e8f4fd;
+            padding: 20px;
+            border-radius: 5px;
+            margin: 20px 0;
+        }
+        .price {
+            font-size: 32px;
+            color: #d32f2f;
+            font-weight: bold;
+        }
+        .specs {
+            display: grid;
+            grid-template-columns: 1fr 2fr;
+            gap: 10px;
+            margin: 20px 0;
+        }
+        .spec-label {
+            font-weight: bold;
+            color: #666;
+        }
+        .tags {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 8px;
+            margin: 20px 0;
+        }
+        .tag {
+            background: #e0e0e0;
+            padding: 5px 12px;
+            border-radius: 20px;
+            font-size: 14px;
+        }
+        .description {
+            white-space: pre-wrap;
+            line-height: 1.6;
+            color: #333;
+        }
+    </style>
+</head>
+<body>
+    <div class="listing-container">
+        <h1>$title</h1>
+        $subtitle_html
+        
+        <div class="price-info">
+            <div>Starting Bid: <span class="price">$$$starting_bid</span></div>
+            <div>Buy It Now: <span class="price">$$$buy_now</span></div>
+            <div style="color: #666; margin-top: 10px;">
+                Estimated Value: $$$price_min - $$$price_max
+            </div>
+        </div>
+        
+        <h2>Item Specifics</h2>
+        <div class="specs">
+            $specs_html
+        </div>
+        
+        <h2>Category</h2>
+        <p>$category_name</p>
+        
+        <h2>Condition</h2>
+        <p><strong>$condition</strong> - $condition_description</p>
+        
+        <h2>Description</h2>
+        <div class="description">$description</div>
+        
+        <h2>Search Tags</h2>
+        <div class="tags">
+            $tags_html
+        </div>
+        
+        <h2>Shipping & Payment</h2>
+        <ul>
+            <li>Weight: $shipping_weight</li>
+            <li>Dimensions: $dimensions</li>
+            <li>Returns: $return_policy</li>
+            <li>Payment Methods: $payment_methods</li>
+        </ul>
+    </div>
+</body>
+</html>
+""")
+
+def _listing_to_dict(listing: EbayListing) -> Dict:
+    """Flat dict for JSON export (asdict deep-copies every field, including the description)"""
+    return {
+        'title': listing.title,
+        'subtitle': listing.subtitle,
+        'description': listing.description,
+        'category_id': listing.category_id,
+        'category_name': listing.category_name,
+        'condition': listing.condition,
+        'condition_description': listing.condition_description,
+        'item_specifics': dict(listing.item_specifics),
+        'suggested_price_min': listing.suggested_price_min,
+        'suggested_price_max': listing.suggested_price_max,
+        'suggested_starting_bid': listing.suggested_starting_bid,
+        'buy_it_now_price': listing.buy_it_now_price,
+        'tags': list(listing.tags),
+        'shipping_weight': listing.shipping_weight,
+        'dimensions': listing.dimensions,
+        'return_policy': listing.return_policy,
+        'payment_methods': list(listing.payment_methods)
+    }
+
+def _write_listings_json(data, output_file: str):
+    """Write a listing (or list of listings) as indented JSON"""
+    if ORJSON_AVAILABLE:
+        # orjson serializes the dataclasses natively
+        Path(output_file).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_file, 'w') as f:
+            json.dump(data, f, indent=2, default=_listing_to_dict)
+
 class EbayArtAnalyzer:
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.environ.get('OPENAI_API_KEY', '')
-        self.ebay_categories = self._load_ebay_categories()
-        self.pricing_database = self._load_pricing_database()
-        
-    def _load_ebay_categories(self) -> Dict:
-        """Load eBay art categories mapping"""
-        return {
-            'paintings': {
-                'oil': 20125,
-                'acrylic': 20126,
-                'watercolor': 20127,
-                'mixed_media': 20128,
-                'pastel': 360010001,
-                'gouache': 360010002
-            },
-            'prints': {
-                'lithograph': 360010003,
-                'screenprint': 360010004,
-                'etching': 360010005,
-                'giclee': 360010006,
-                'woodblock': 360010007,
-                'offset_lithograph': 360010008
-            },
-            'drawings': {
-                'pencil': 20130,
-                'charcoal': 20131,
-                'ink': 20132,
-                'colored_pencil': 360010009,
-                'marker': 360010010
-            },
-            'photographs': {
-                'vintage': 360010011,
-                'contemporary': 360010012,
-                'digital': 360010013,
-                'film': 360010014
-            },
-            'sculptures': {
-                'bronze': 553,
-                'marble': 554,
-                'wood': 555,
-                'ceramic': 556,
-                'metal': 557,
-                'glass': 558
-            },
-            'digital_art': {
-                'nft': 360010015,
-                'digital_print': 360010016,
-                'ai_generated': 360010017
-            }
-        }
-    
-    def _load_pricing_database(self) -> Dict:
-        """Load pricing guidelines based on artwork characteristics"""
-        return {
-            'size_multipliers': {
-                'miniature': 0.5,
-                'small': 0.8,
-                'medium': 1.0,
-                'large': 1.5,
-                'oversized': 2.0
-            },
-            'condition_multipliers': {
-                'mint': 1.2,
-                'excellent': 1.0,
-                'very_good': 0.8,
-                'good': 0.6,
-                'fair': 0.4,
-                'poor': 0.2
-            },
-            'medium_base_prices': {
-                'oil_painting': 500,
-                'acrylic_painting': 350,
-                'watercolor': 250,
-                'print': 150,
-                'photograph': 200,
-                'drawing': 180,
-                'sculpture': 600,
-                'mixed_media': 400,
-                'digital': 100
-            },
-            'authenticity_multipliers': {
-                'signed': 1.5,
-                'numbered': 1.3,
-                'certificate': 2.0,
-                'provenance': 2.5
-            }
-        }
-    
+        self.ebay_categories = EBAY_ART_CATEGORIES
+        self.pricing_database = PRICING_DATABASE
+        
     def analyze_image(self, image_path: str) -> ArtworkAnalysis:
         """Analyze artwork image using AI vision API"""
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
         
-        # Encode image
+        # Without an API key there is nothing to send, so skip reading and encoding the image
+        if not self.api_key:
+            return self._mock_analysis(image_path)
+        
+        # Encode image straight from a memory map instead of reading a full copy first
         with open(image_path, 'rb') as img_file:
-            img_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+            if os.fstat(img_file.fileno()).st_size:
+                with mmap.mmap(img_file.fileno(), 0, access=mmap.ACCESS_READ) as img_map:
+                    img_base64 = base64.b64encode(img_map)
+            else:
+                img_base64 = b''
         
         # Prepare vision API request
         headers = {
@@ -180,7 +420,7 @@ class EbayArtAnalyzer:
                         {
                             'type': 'image_url',
                             'image_url': {
-                                'url': f'data:image/jpeg;base64,{img_base64}'
+                                'url': 'data:image/jpeg;base64,' + img_base64.decode('ascii')
                             }
                         }
                     ]
@@ -211,56 +451,52 @@ class EbayArtAnalyzer:
             authenticity_markers=["Artist signature", "Gallery stamp on reverse"]
         )
     
-    def determine_category(self, analysis: ArtworkAnalysis) -> Tuple[int, str]:
+    def determine_category(self, analysis: ArtworkAnalysis,
+                           medium_lower: Optional[str] = None) -> Tuple[int, str]:
         """Determine appropriate eBay category based on analysis"""
-        medium_lower = analysis.medium.lower()
-        
-        # Map medium to category
-        if 'oil' in medium_lower:
-            return 20125, "Art > Paintings > Oil Paintings"
-        elif 'acrylic' in medium_lower:
-            return 20126, "Art > Paintings > Acrylic Paintings"
-        elif 'watercolor' in medium_lower:
-            return 20127, "Art > Paintings > Watercolor Paintings"
-        elif 'print' in medium_lower or 'lithograph' in medium_lower:
-            return 360010003, "Art > Prints > Lithographs"
-        elif 'photograph' in medium_lower:
-            return 360010011, "Art > Photographs > Contemporary"
-        elif 'drawing' in medium_lower or 'pencil' in medium_lower:
-            return 20130, "Art > Drawings > Pencil Drawings"
-        elif 'sculpture' in medium_lower:
-            return 553, "Art > Sculptures > Contemporary"
-        elif 'digital' in medium_lower:
-            return 360010016, "Art > Digital Art > Digital Prints"
-        else:
-            return 20128, "Art > Paintings > Mixed Media"
+        if medium_lower is None:
+            medium_lower = analysis.medium.lower()
+        
+        # Table order is the priority: "acrylic and oil" is an oil painting
+        for keyword, category in MEDIUM_CATEGORIES:
+            if keyword in medium_lower:
+                return category
+        return DEFAULT_CATEGORY
     
-    def calculate_pricing(self, analysis: ArtworkAnalysis) -> Tuple[float, float, float, float]:
+    def calculate_pricing(self, analysis: ArtworkAnalysis,
+                          medium_lower: Optional[str] = None) -> Tuple[float, float, float, float]:
         """Calculate suggested pricing based on artwork characteristics"""
+        if medium_lower is None:
+            medium_lower = analysis.medium.lower()
+        has_certificate = any('certificate' in marker.lower() for marker in analysis.authenticity_markers)
+        return self._price_core(medium_lower, analysis.size_category, analysis.condition,
+                                analysis.signature_present, has_certificate)
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _price_core(medium_lower: str, size_category: str, condition: str,
+                    signed: bool, has_certificate: bool) -> Tuple[float, float, float, float]:
+        """Price range for one combination of artwork characteristics (cached, batches repeat them)"""
         # Get base price for medium
-        medium_key = analysis.medium.lower().replace(' ', '_')
+        medium_key = medium_lower.replace(' ', '_')
         base_price = 250  # Default
         
-        for key, price in self.pricing_database['medium_base_prices'].items():
+        for key, price in PRICING_DATABASE['medium_base_prices'].items():
             if key in medium_key:
                 base_price = price
                 break
         
         # Apply size multiplier
-        size_mult = self.pricing_database['size_multipliers'].get(
-            analysis.size_category, 1.0
-        )
+        size_mult = PRICING_DATABASE['size_multipliers'].get(size_category, 1.0)
         
         # Apply condition multiplier
-        condition_mult = self.pricing_database['condition_multipliers'].get(
-            analysis.condition.lower(), 0.8
-        )
+        condition_mult = PRICING_DATABASE['condition_multipliers'].get(condition.lower(), 0.8)
         
         # Apply authenticity multipliers
         auth_mult = 1.0
-        if analysis.signature_present:
-            auth_mult *= self.pricing_database['authenticity_multipliers']['signed']
-        if any('certificate' in marker.lower() for marker in analysis.authenticity_markers):
+        if signed:
+            auth_mult *= PRICING_DATABASE['authenticity_multipliers']['signed']
+        if has_certificate:
             auth_mult *= 1.3
         
         # Calculate final price
@@ -281,125 +517,85 @@ class EbayArtAnalyzer:
     
     def generate_description(self, analysis: ArtworkAnalysis) -> str:
         """Generate compelling eBay listing description"""
-        description = f"""
-🎨 {analysis.title}
-
-ARTWORK DETAILS:
-━━━━━━━━━━━━━━━━━━━━━━━━
-• Medium: {analysis.medium}
-• Style: {analysis.style}
-• Period: {analysis.estimated_year or 'Contemporary'}
-• Condition: {analysis.condition}
-• Size Category: {analysis.size_category.title()}
-• Frame: {analysis.frame_info}
-
-DESCRIPTION:
-This captivating {analysis.style.lower()} piece showcases {analysis.subject_matter.lower()}. 
-The artwork features a rich palette of {', '.join(analysis.colors[:3])} tones, 
-creating a dynamic visual experience that commands attention.
-
-KEY FEATURES:
-✓ {analysis.medium} artwork in {analysis.condition.lower()} condition
-✓ {'Signed by artist' if analysis.signature_present else 'Unsigned piece'}
-✓ {analysis.frame_info}
-✓ Perfect for collectors and art enthusiasts
-
-AUTHENTICITY:
-"""
+        header = DESCRIPTION_HEADER_TEMPLATE.format(
+            title=analysis.title,
+            medium=analysis.medium,
+            style=analysis.style,
+            period=analysis.estimated_year or 'Contemporary',
+            condition=analysis.condition,
+            size_category=analysis.size_category.title(),
+            frame_info=analysis.frame_info,
+            style_lower=analysis.style.lower(),
+            subject_lower=analysis.subject_matter.lower(),
+            colors=', '.join(analysis.colors[:3]),
+            condition_lower=analysis.condition.lower(),
+            signed='Signed by artist' if analysis.signature_present else 'Unsigned piece'
+        )
         
         if analysis.authenticity_markers:
-            for marker in analysis.authenticity_markers:
-                description += f"• {marker}\n"
+            markers = [f"• {marker}\n" for marker in analysis.authenticity_markers]
         else:
-            description += "• Sold as-is without authentication\n"
+            markers = ["• Sold as-is without authentication\n"]
         
-        description += """
-SHIPPING & HANDLING:
-• Carefully packaged with protective materials
-• Ships within 1-2 business days
-• Tracking number provided
-• International shipping available
-
-RETURNS:
-• 30-day return policy
-• Buyer pays return shipping
-• Item must be returned in original condition
-
-PAYMENT:
-• PayPal accepted
-• Immediate payment required for Buy It Now
-
-Please review all photos carefully and ask any questions before bidding.
-Thank you for viewing this exceptional artwork!
-"""
-        return description.strip()
+        return ''.join([header, *markers, DESCRIPTION_FOOTER]).strip()
     
-    def generate_tags(self, analysis: ArtworkAnalysis) -> List[str]:
+    def generate_tags(self, analysis: ArtworkAnalysis, medium_lower: Optional[str] = None) -> List[str]:
         """Generate relevant search tags"""
-        tags = []
-        
-        # Add medium tags
-        medium_words = analysis.medium.lower().split()
-        tags.extend(medium_words)
-        
-        # Add style tags
-        style_words = analysis.style.lower().split()
-        tags.extend(style_words)
-        
-        # Add color tags
-        tags.extend([color.lower() for color in analysis.colors[:3]])
-        
-        # Add subject tags
-        subject_words = analysis.subject_matter.lower().split()
-        tags.extend([w for w in subject_words if len(w) > 3][:5])
-        
-        # Add general tags
-        tags.extend([
-            'art', 'artwork', 'original', 'handmade', 'wall art',
-            'home decor', 'collectible', 'fine art'
-        ])
-        
-        # Add condition tags
-        if analysis.condition.lower() in ['mint', 'excellent']:
-            tags.append('pristine')
-        
-        # Add authenticity tags
-        if analysis.signature_present:
-            tags.extend(['signed', 'authentic'])
+        if medium_lower is None:
+            medium_lower = analysis.medium.lower()
+        # Lazily chained in priority order, so collection stops as soon as the cap is reached
+        candidates = chain(
+            medium_lower.split(),
+            analysis.style.lower().split(),
+            (color.lower() for color in analysis.colors[:3]),
+            islice((w for w in analysis.subject_matter.lower().split() if len(w) > 3), 5),
+            GENERAL_TAGS,
+            ('pristine',) if analysis.condition.lower() in ('mint', 'excellent') else (),
+            ('signed', 'authentic') if analysis.signature_present else ()
+        )
         
-        # Remove duplicates and limit
-        unique_tags = list(dict.fromkeys(tags))
-        return unique_tags[:30]  # eBay limit
+        # dict keeps first-seen order while dropping duplicates
+        tags = {}
+        for tag in candidates:
+            tags[tag] = None
+            if len(tags) == MAX_TAGS:
+                break
+        return list(tags)
     
     def create_listing(self, image_path: str) -> EbayListing:
         """Create complete eBay listing from image"""
         # Analyze the image
         analysis = self.analyze_image(image_path)
+        medium_lower = analysis.medium.lower()
         
         # Determine category
-        category_id, category_name = self.determine_category(analysis)
+        category_id, category_name = self.determine_category(analysis, medium_lower)
         
         # Calculate pricing
-        min_price, max_price, starting_bid, buy_now = self.calculate_pricing(analysis)
+        min_price, max_price, starting_bid, buy_now = self.calculate_pricing(analysis, medium_lower)
         
         # Generate description
         description = self.generate_description(analysis)
         
         # Generate tags
-        tags = self.generate_tags(analysis)
+        tags = self.generate_tags(analysis, medium_lower)
         
         # Create item specifics
+        condition_lower = analysis.condition.lower()
+        is_print = 'print' in medium_lower
+        features = (', '.join(analysis.authenticity_markers[:3])
+                    if analysis.authenticity_markers else 'Original Artwork')
         item_specifics = {
             'Type': analysis.medium,
             'Style': analysis.style,
             'Subject': analysis.subject_matter,
             'Size Type/Largest Dimension': analysis.size_category.title(),
-            'Features': ', '.join(analysis.authenticity_markers[:3]) if analysis.authenticity_markers else 'Original Artwork',
+            'Features': features,
             'Year of Production': analysis.estimated_year or 'Unknown',
-            'Material': 'Canvas' if 'canvas' in analysis.medium.lower() else 'Paper',
+            'Material': 'Canvas' if 'canvas' in medium_lower else 'Paper',
             'Framing': 'Framed' if 'framed' in analysis.frame_info.lower() else 'Unframed',
             'Signed': 'Yes' if analysis.signature_present else 'No',
-            'Originality': 'Original' if 'print' not in analysis.medium.lower() else 'Print',
+            'Originality': 'Print' if is_print else 'Original',
             'Color': ', '.join(analysis.colors[:3])
         }
         
@@ -410,8 +606,8 @@ Thank you for viewing this exceptional artwork!
             description=description,
             category_id=category_id,
             category_name=category_name,
-            condition="Used" if analysis.condition.lower() not in ['mint', 'new'] else "New",
-            condition_description=f"Artwork in {analysis.condition.lower()} condition. See photos for details.",
+            condition="New" if condition_lower in ('mint', 'new') else "Used",
+            condition_description=f"Artwork in {condition_lower} condition. See photos for details.",
             item_specifics=item_specifics,
             suggested_price_min=min_price,
             suggested_price_max=max_price,
@@ -432,39 +628,48 @@ Thank you for viewing this exceptional artwork!
             return title
         return title[:77] + "..."
     
-    def batch_process(self, image_folder: str, output_file: str = "ebay_listings.json") -> List[EbayListing]:
+    def batch_process(self, image_folder: str, output_file: str = "ebay_listings.json",
+                      max_concurrency: int = MAX_CONCURRENT_ANALYSES) -> List[EbayListing]:
         """Process multiple images and generate listings"""
-        image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
-        listings = []
-        
-        folder_path = Path(image_folder)
-        if not folder_path.exists():
+        if not os.path.exists(image_folder):
             raise ValueError(f"Folder not found: {image_folder}")
         
-        # Process each image
-        for image_file in folder_path.iterdir():
-            if image_file.suffix.lower() in image_extensions:
-                print(f"Processing: {image_file.name}")
-                try:
-                    listing = self.create_listing(str(image_file))
-                    listings.append(listing)
-                    print(f"✓ Created listing: {listing.title}")
-                except Exception as e:
-                    print(f"✗ Error processing {image_file.name}: {e}")
+        # scandir's entries carry the file type, so filtering needs no extra stat calls
+        with os.scandir(image_folder) as entries:
+            image_files = [entry.path for entry in entries
+                           if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS]
+        results = {}
+        
+        # Analyze images concurrently, reporting each one as soon as it finishes
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {executor.submit(self._create_listing_safe, p): p for p in image_files}
+            for done, future in enumerate(as_completed(futures), 1):
+                image_file, listing, error = future.result()
+                results[image_file] = listing
+                if error is None:
+                    print(f"[{done}/{len(futures)}] ✓ Created listing: {listing.title}")
+                else:
+                    print(f"[{done}/{len(futures)}] ✗ Error processing {os.path.basename(image_file)}: {error}")
+        
+        # Keep the saved listings in folder order regardless of completion order
+        listings = [results[p] for p in image_files if results[p] is not None]
         
         # Save to JSON
         if listings:
-            with open(output_file, 'w') as f:
-                listings_data = [asdict(listing) for listing in listings]
-                json.dump(listings_data, f, indent=2)
+            _write_listings_json(listings, output_file)
             print(f"\n✓ Saved {len(listings)} listings to {output_file}")
         
         return listings
     
+    def _create_listing_safe(self, image_file: str) -> Tuple[str, Optional[EbayListing], Optional[Exception]]:
+        """Create a listing for one image, returning the error instead of raising"""
+        try:
+            return image_file, self.create_listing(image_file), None
+        except Exception as e:
+            return image_file, None, e
+    
     def export_to_csv(self, listings: List[EbayListing], output_file: str = "ebay_listings.csv"):
         """Export listings to CSV format for bulk upload"""
-        import csv
-        
         with open(output_file, 'w', newline='', encoding='utf-8') as f:
             fieldnames = [
                 'Title', 'Subtitle', 'Category ID', 'Condition', 'Start Price',
@@ -472,143 +677,50 @@ Thank you for viewing this exceptional artwork!
                 'Duration', 'Location', 'Payment Methods', 'Shipping Service'
             ]
             
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            
-            for listing in listings:
-                writer.writerow({
-                    'Title': listing.title,
-                    'Subtitle': listing.subtitle,
-                    'Category ID': listing.category_id,
-                    'Condition': listing.condition,
-                    'Start Price': listing.suggested_starting_bid,
-                    'Buy It Now Price': listing.buy_it_now_price,
-                    'Description': listing.description[:4000],  # eBay limit
-                    'PicURL': '',  # To be filled with actual image URLs
-                    'Quantity': 1,
-                    'Duration': 7,  # 7-day auction
-                    'Location': 'United States',
-                    'Payment Methods': '|'.join(listing.payment_methods),
-                    'Shipping Service': 'USPS Priority Mail'
-                })
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            writer.writerows(
+                (
+                    listing.title,
+                    listing.subtitle,
+                    listing.category_id,
+                    listing.condition,
+                    listing.suggested_starting_bid,
+                    listing.buy_it_now_price,
+                    listing.description[:4000],  # eBay limit
+                    '',  # PicURL, to be filled with actual image URLs
+                    1,  # Quantity
+                    7,  # Duration: 7-day auction
+                    'United States',
+                    '|'.join(listing.payment_methods),
+                    'USPS Priority Mail'
+                )
+                for listing in listings
+            )
         
         print(f"✓ Exported {len(listings)} listings to {output_file}")
     
     def generate_html_preview(self, listing: EbayListing, output_file: str = "listing_preview.html"):
         """Generate HTML preview of the listing"""
-        html_content = f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{listing.title}</title>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            max-width: 900px;
-            margin: 0 auto;
-            padding: 20px;
-            background: #f5f5f5;
-        }}
-        .listing-container {{
-            background: white;
-            border-radius: 8px;
-            padding: 30px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
-        h1 {{
-            color: #333;
-            border-bottom: 3px solid #0064d2;
-            padding-bottom: 10px;
-        }}
-        h2 {{
-            color: #0064d2;
-            margin-top: 30px;
-        }}
-        .price-info {{
-            background: #e8f4fd;
-            padding: 20px;
-            border-radius: 5px;
-            margin: 20px 0;
-        }}
-        .price {{
-            font-size: 32px;
-            color: #d32f2f;
-            font-weight: bold;
-        }}
-        .specs {{
-            display: grid;
-            grid-template-columns: 1fr 2fr;
-            gap: 10px;
-            margin: 20px 0;
-        }}
-        .spec-label {{
-            font-weight: bold;
-            color: #666;
-        }}
-        .tags {{
-            display: flex;
-            flex-wrap: wrap;
-            gap: 8px;
-            margin: 20px 0;
-        }}
-        .tag {{
-            background: #e0e0e0;
-            padding: 5px 12px;
-            border-radius: 20px;
-            font-size: 14px;
-        }}
-        .description {{
-            white-space: pre-wrap;
-            line-height: 1.6;
-            color: #333;
-        }}
-    </style>
-</head>
-<body>
-    <div class="listing-container">
-        <h1>{listing.title}</h1>
-        {f'<h3>{listing.subtitle}</h3>' if listing.subtitle else ''}
-        
-        <div class="price-info">
-            <div>Starting Bid: <span class="price">${listing.suggested_starting_bid:.2f}</span></div>
-            <div>Buy It Now: <span class="price">${listing.buy_it_now_price:.2f}</span></div>
-            <div style="color: #666; margin-top: 10px;">
-                Estimated Value: ${listing.suggested_price_min:.2f} - ${listing.suggested_price_max:.2f}
-            </div>
-        </div>
-        
-        <h2>Item Specifics</h2>
-        <div class="specs">
-            {''.join(f'<div class="spec-label">{k}:</div><div>{v}</div>' for k, v in listing.item_specifics.items())}
-        </div>
-        
-        <h2>Category</h2>
-        <p>{listing.category_name}</p>
-        
-        <h2>Condition</h2>
-        <p><strong>{listing.condition}</strong> - {listing.condition_description}</p>
-        
-        <h2>Description</h2>
-        <div class="description">{listing.description}</div>
-        
-        <h2>Search Tags</h2>
-        <div class="tags">
-            {''.join(f'<span class="tag">{tag}</span>' for tag in listing.tags)}
-        </div>
-        
-        <h2>Shipping & Payment</h2>
-        <ul>
-            <li>Weight: {listing.shipping_weight}</li>
-            <li>Dimensions: {listing.dimensions}</li>
-            <li>Returns: {listing.return_policy}</li>
-            <li>Payment Methods: {', '.join(listing.payment_methods)}</li>
-        </ul>
-    </div>
-</body>
-</html>
-"""
+        html_content = HTML_PREVIEW_TEMPLATE.substitute(
+            title=listing.title,
+            subtitle_html=f'<h3>{listing.subtitle}</h3>' if listing.subtitle else '',
+            starting_bid=f"{listing.suggested_starting_bid:.2f}",
+            buy_now=f"{listing.buy_it_now_price:.2f}",
+            price_min=f"{listing.suggested_price_min:.2f}",
+            price_max=f"{listing.suggested_price_max:.2f}",
+            specs_html=''.join(f'<div class="spec-label">{k}:</div><div>{v}</div>'
+                               for k, v in listing.item_specifics.items()),
+            category_name=listing.category_name,
+            condition=listing.condition,
+            condition_description=listing.condition_description,
+            description=listing.description,
+            tags_html=''.join(f'<span class="tag">{tag}</span>' for tag in listing.tags),
+            shipping_weight=listing.shipping_weight,
+            dimensions=listing.dimensions,
+            return_policy=listing.return_policy,
+            payment_methods=', '.join(listing.payment_methods)
+        )
         
         with open(output_file, 'w') as f:
             f.write(html_content)
@@ -649,15 +761,17 @@ def main():
     analyzer.generate_html_preview(listing)
     
     # Save to JSON
-    with open('sample_listing.json', 'w') as f:
-        json.dump(asdict(listing), f, indent=2)
+    _write_listings_json(listing, 'sample_listing.json')
     
     print("\n✓ Listing saved to sample_listing.json")
     print("✓ HTML preview saved to listing_preview.html")
     
-    # Clean up test file
-    if os.path.exists(image_path) and os.path.getsize(image_path) < 100:
-        os.remove(image_path)
+    # Clean up test file (one stat covers both the existence and size checks)
+    try:
+        if os.stat(image_path).st_size < 100:
+            os.remove(image_path)
+    except FileNotFoundError:
+        pass
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,11 +4,161 @@ eBay Listing Automation for Art Gallery
 Automated creation of eBay listings from inventory
 """
 
+import csv
+import glob
+import io
 import os
-import json
-from typing import Dict, List, Any, Optional
+import re
+import string
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Any, Optional, Sequence, Tuple
 from datetime import datetime
-from ebay_api_integration import eBayAPIIntegration
+from contextlib import contextmanager
+from functools import lru_cache
+from ebay_api_integration import (
+    eBayAPIIntegration, CONNECTION_POOL_SIZE, EBAY_CONDITION_IDS, MAX_CONCURRENT_REQUESTS,
+    json_dumps, json_loads
+)
+
+# ijson is optional; without it iter_listings walks the in-memory listings index
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# fcntl (POSIX only) lets separate processes coordinate on the listings log
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# numpy is optional (pandas brings it in); batch fee estimates fall back to plain Python
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# eBay fee structure (approximate for art category)
+INSERTION_FEE = 0.30  # First listing free, then $0.30
+FINAL_VALUE_FEE_RATE = 0.125  # 12.5% for most categories
+PAYMENT_FEE_RATE = 0.029  # PayPal/Payment processing (approximate): 2.9% + $0.30
+PAYMENT_FEE_FIXED = 0.30
+PROFIT_KEYS = ('cost', 'sale_price', 'gross_profit', 'net_profit', 'profit_margin', 'fees_total')
+FEE_KEYS = ('insertion_fee', 'final_value_fee', 'payment_processing', 'total_fees', 'net_amount')
+
+YEAR_RE = re.compile(r'\d{4}')
+
+# Batch progress lines buffered before each write to stdout
+PROGRESS_FLUSH_LINES = 50
+
+# Keywords appended to every listing after the template and product keywords
+GALLERY_KEYWORDS = ('gauntlet gallery', 'art')
+
+# Product fields that listing previews/creation derive their title, template and price from
+ARTIFACT_FIELDS = ('artist', 'title', 'medium', 'year', 'edition', 'edition_type', 'style',
+                   'sale_price')
+_MISSING = object()
+
+# Sell Feed API bulk uploads (File Exchange CSV), used for larger batches
+FEED_TYPE = 'FX_LISTING'
+FEED_SCHEMA_VERSION = '1.0'
+FEED_MIN_PRODUCTS = 20
+FEED_MAX_FILE_BYTES = 25 * 1024 * 1024  # eBay's upload limit per feed file
+FEED_FINAL_STATUSES = frozenset({'COMPLETED', 'COMPLETED_WITH_ERROR', 'PARTIALLY_PROCESSED', 'FAILED'})
+FEED_CSV_HEADER = (
+    '*Action(SiteID=US|Country=US|Currency=USD|Version=1193)', 'CustomLabel', '*Category',
+    '*Title', '*ConditionID', '*Description', '*Format', '*Duration', '*StartPrice',
+    '*Quantity', '*Location', 'PicURL'
+)
+
+# Listings by SKU; new listings are appended to the log file and folded in periodically
+LISTINGS_FILE = 'ebay_listings.json'
+LISTINGS_LOG_FILE = 'ebay_listings.jsonl'
+LISTINGS_LOCK_FILE = 'ebay_listings.lock'
+LOG_SNAPSHOT_SUFFIX = '.compacting'
+LISTINGS_LOG_COMPACT_BYTES = 256 * 1024  # Writers fold the log in once it grows past this
+
+# Serializes log appends and compaction across every instance in this process
+_LISTINGS_FILES_LOCK = threading.Lock()
+
+@contextmanager
+def _listings_files_lock(exclusive: bool):
+    """Hold the in-process listings lock, plus a shared/exclusive flock for other processes where available"""
+    with _LISTINGS_FILES_LOCK:
+        if not FCNTL_AVAILABLE:
+            yield
+            return
+        with open(LISTINGS_LOCK_FILE, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield  # Closing the file releases the flock
+
+def _file_key(path: str) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _log_snapshots() -> List[str]:
+    """Listings logs moved aside for compaction and not yet folded in, oldest first"""
+    return sorted(glob.glob(f"{glob.escape(LISTINGS_LOG_FILE)}.*{LOG_SNAPSHOT_SUFFIX}"),
+                  key=os.path.getmtime)
+
+@lru_cache(maxsize=512)
+def _resolve_template_key(medium: str, edition_type: str, year: int) -> str:
+    """Template name for a lowercased medium/edition type and a year (0 if unknown)"""
+    if 'photograph' in medium or 'photo' in medium:
+        return 'photography'
+    elif 'print' in medium or 'edition' in edition_type:
+        return 'print'
+    elif year and year < 1990:
+        return 'vintage'
+    else:
+        return 'contemporary'
+
+def _csv_line(row: Sequence[Any]) -> bytes:
+    """Encode one CSV row as UTF-8 bytes"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue().encode('utf-8')
+
+def _cost_or_zero(value: Any) -> float:
+    """A product's cost as a float, or 0 when it is blank or not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _price_columns(products: List[Dict[str, Any]]) -> Tuple[List[float], List[float]]:
+    """Sale prices and costs as parallel columns for the batch fee/profit calculations"""
+    # Listed products already have a valid sale price; an unusable cost only skews the estimate
+    return (
+        [float(product.get('sale_price', 100)) for product in products],
+        [_cost_or_zero(product.get('cost', 0)) for product in products]
+    )
+
+def _write_lines(lines: List[str]):
+    """Write buffered progress lines to stdout in one call and clear the buffer"""
+    if lines:
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+        lines.clear()
+
+def _compile_title(title_template: str) -> Callable[[Dict[str, Any]], str]:
+    """Parse a title template once and return a function that fills it from a dict"""
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(title_template)]
+    return lambda values: ''.join(
+        literal + (str(values.get(field, '')) if field else '') for literal, field in parts
+    )
 
 class eBayListingAutomation:
     """Automated eBay listing creation for art gallery"""
@@ -16,7 +166,31 @@ class eBayListingAutomation:
     def __init__(self):
         """Initialize eBay automation"""
         self.ebay_api = eBayAPIIntegration()
+        
+        # Listing page URLs only depend on the environment, which is fixed per instance
+        if self.ebay_api.credentials['environment'] == 'sandbox':
+            self._item_url_prefix = 'https://www.sandbox.ebay.com/itm/'
+        else:
+            self._item_url_prefix = 'https://www.ebay.com/itm/'
         self.listing_templates = self._load_listing_templates()
+        self._title_formatters = {
+            name: _compile_title(template['title_template'])
+            for name, template in self.listing_templates.items()
+        }
+        
+        self._template_keywords = {
+            name: tuple(k for k in template['keywords'] if k)
+            for name, template in self.listing_templates.items()
+        }
+        
+        # Previews are usually followed by creating the same listing; share the work
+        self._cached_listing_artifacts = lru_cache(maxsize=256)(self._listing_artifacts_for_key)
+        
+        # Guards the cached listings index below (file access goes through _listings_files_lock)
+        self._listings_lock = threading.Lock()
+        self._listings_index = {}
+        self._listings_file_key = None
+        self._log_entries = {}  # log path -> (file key, {sku: listing})
         
         print("🎨 eBay Listing Automation for Gauntlet Gallery initialized")
     
@@ -49,11 +223,11 @@ class eBayListingAutomation:
             }
         }
     
-    def create_listing_from_inventory(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create eBay listing from inventory product"""
+    def create_listing_from_inventory(self, product_data: Dict[str, Any], quiet: bool = False) -> Dict[str, Any]:
+        """Create eBay listing from inventory product; quiet leaves reporting to the caller"""
         try:
-            # Step 1: Determine art type and template
-            template = self._select_template(product_data)
+            # Step 1: Determine art type and template (reuses a preceding preview's work)
+            artifacts = self._build_listing_artifacts(product_data)
             
             # Step 2: Create inventory item
             inventory_result = self.ebay_api.create_inventory_item(product_data)
@@ -61,7 +235,7 @@ class eBayListingAutomation:
                 return inventory_result
             
             sku = inventory_result['sku']
-            price = float(product_data.get('sale_price', 100))
+            price = artifacts['price']
             
             # Step 3: Create offer
             offer_result = self.ebay_api.create_offer(sku, price)
@@ -78,25 +252,28 @@ class eBayListingAutomation:
                 'sku': sku,
                 'offer_id': offer_id,
                 'price': price,
-                'template_used': template['title_template'],
+                'template_used': artifacts['template']['title_template'],
                 'status': 'draft',  # Change to 'published' if auto-publishing
-                'ebay_url': f"https://www.sandbox.ebay.com/itm/{sku}" if self.ebay_api.credentials['environment'] == 'sandbox' else f"https://www.ebay.com/itm/{sku}",
+                'ebay_url': self._item_url_prefix + sku,
                 'message': 'eBay listing created successfully (draft mode)'
             }
             
             # Save listing info
             self._save_listing_info(product_data['sku'], result)
             
-            print(f"✅ eBay listing created for {product_data.get('artist', 'Unknown')} - {product_data.get('title', 'Artwork')}")
+            if not quiet:
+                print(f"✅ eBay listing created for {product_data.get('artist', 'Unknown')} - {product_data.get('title', 'Artwork')}")
             
             return result
             
         except Exception as e:
-            print(f"❌ eBay listing creation failed: {str(e)}")
+            if not quiet:
+                print(f"❌ eBay listing creation failed: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def batch_create_listings(self, inventory_products: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Create multiple eBay listings from inventory"""
+    def batch_create_listings(self, inventory_products: List[Dict[str, Any]],
+                              max_concurrency: int = MAX_CONCURRENT_REQUESTS) -> Dict[str, Any]:
+        """Create multiple eBay listings from inventory, several at a time"""
         results = {
             'total_processed': 0,
             'successful': 0,
@@ -105,152 +282,448 @@ class eBayListingAutomation:
             'errors': []
         }
         
-        for product in inventory_products:
-            results['total_processed'] += 1
+        # Refresh once up front so worker threads don't race to refresh the token
+        self.ebay_api.ensure_valid_token()
+        
+        # Every worker shares the API client's keep-alive session; don't outgrow its pool
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, CONNECTION_POOL_SIZE)) as executor:
+            futures = [executor.submit(self.create_listing_from_inventory, p, quiet=True) for p in inventory_products]
             
-            try:
-                listing_result = self.create_listing_from_inventory(product)
+            # Tally in input order as the listings finish (workers stay quiet so their
+            # output doesn't interleave); progress lines are written in blocks rather
+            # than one print (and flush) per product
+            progress = []
+            for product, future in zip(inventory_products, futures):
+                results['total_processed'] += 1
+                if len(progress) >= PROGRESS_FLUSH_LINES:
+                    _write_lines(progress)
                 
-                if listing_result.get('success'):
-                    results['successful'] += 1
-                    results['listings'].append(listing_result)
+                try:
+                    listing_result = future.result()
                     
-                    print(f"✅ {results['successful']}/{results['total_processed']}: {product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}")
-                else:
+                    if listing_result.get('success'):
+                        results['successful'] += 1
+                        results['listings'].append(listing_result)
+                        
+                        progress.append(f"✅ {results['successful']}/{results['total_processed']}: {product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}")
+                    else:
+                        results['failed'] += 1
+                        error_info = {
+                            'sku': product.get('sku'),
+                            'title': f"{product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}",
+                            'error': listing_result.get('error', 'Unknown error')
+                        }
+                        results['errors'].append(error_info)
+                        
+                        progress.append(f"❌ {results['failed']} failed: {error_info['title']} - {error_info['error']}")
+                        
+                except Exception as e:
                     results['failed'] += 1
                     error_info = {
                         'sku': product.get('sku'),
                         'title': f"{product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}",
-                        'error': listing_result.get('error', 'Unknown error')
+                        'error': str(e)
                     }
                     results['errors'].append(error_info)
-                    
-                    print(f"❌ {results['failed']} failed: {error_info['title']} - {error_info['error']}")
-                    
-            except Exception as e:
-                results['failed'] += 1
-                error_info = {
-                    'sku': product.get('sku'),
-                    'title': f"{product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}",
-                    'error': str(e)
-                }
-                results['errors'].append(error_info)
+            _write_lines(progress)
+        
+        self._compact_listings()
+        
+        # Projected fees and profit for everything listed, computed column-wise in one pass
+        listed = [product for product, future in zip(inventory_products, futures)
+                  if not future.exception() and future.result().get('success')]
+        profit = self._calculate_profit_batch(*_price_columns(listed))
+        results['estimated_fees_total'] = round(float(sum(profit['fees_total'])), 2)
+        results['estimated_profit_total'] = round(float(sum(profit['net_profit'])), 2)
         
         # Summary
         print(f"\n📊 Batch eBay Listing Results:")
         print(f"   ✅ Successful: {results['successful']}")
         print(f"   ❌ Failed: {results['failed']}")
         print(f"   📦 Total: {results['total_processed']}")
+        print(f"   💸 Estimated fees: ${results['estimated_fees_total']:.2f}")
+        print(f"   💰 Estimated net profit: ${results['estimated_profit_total']:.2f}")
         
         return results
     
-    def _select_template(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Select appropriate listing template based on product data"""
-        medium = product_data.get('medium', '').lower()
-        style = product_data.get('style', '').lower()
-        year = product_data.get('year', '')
-        
-        # Determine template type
-        if 'photograph' in medium or 'photo' in medium:
-            return self.listing_templates['photography']
-        elif 'print' in medium or 'edition' in product_data.get('edition_type', '').lower():
-            return self.listing_templates['print']
-        elif year and int(str(year)[:4]) < 1990:
-            return self.listing_templates['vintage']
-        else:
-            return self.listing_templates['contemporary']
+    def batch_create_listings_feed(self, inventory_products: List[Dict[str, Any]],
+                                   poll_interval: float = 10.0, timeout: float = 1800.0) -> Dict[str, Any]:
+        """Create many eBay listings through Sell Feed API bulk uploads instead of per-SKU calls"""
+        # Small batches turn around faster through the regular per-SKU calls
+        if len(inventory_products) < FEED_MIN_PRODUCTS:
+            return self.batch_create_listings(inventory_products)
+        
+        results = {
+            'total_processed': 0,
+            'successful': 0,
+            'failed': 0,
+            'listings': [],
+            'errors': [],
+            'feed_tasks': []
+        }
+        
+        for chunk_number, (products, content) in enumerate(self._feed_csv_chunks(inventory_products), 1):
+            task = self._run_feed_task(f"listings_{chunk_number}.csv", content, poll_interval, timeout)
+            results['feed_tasks'].append(task)
+            print(f"📤 Feed task {task['task_id']}: {task['status']} ({len(products)} listings)")
+            
+            for product in products:
+                results['total_processed'] += 1
+                if task['status'] == 'COMPLETED':
+                    artifacts = self._build_listing_artifacts(product)
+                    listing = {
+                        'success': True,
+                        'sku': product.get('sku'),
+                        'task_id': task['task_id'],
+                        'price': artifacts['price'],
+                        'template_used': artifacts['template']['title_template'],
+                        'status': 'submitted',
+                        'ebay_url': self._item_url_prefix + product.get('sku', '')
+                    }
+                    results['successful'] += 1
+                    results['listings'].append(listing)
+                    self._save_listing_info(product.get('sku'), listing)
+                else:
+                    results['failed'] += 1
+                    results['errors'].append({
+                        'sku': product.get('sku'),
+                        'title': f"{product.get('artist', 'Unknown')} - {product.get('title', 'Artwork')}",
+                        'error': task['error'] or (f"Feed task {task['task_id']} finished as "
+                                                   f"{task['status']}; see its result file")
+                    })
+        
+        self._compact_listings()
+        
+        # Summary
+        print(f"\n📊 Bulk eBay Listing Results:")
+        print(f"   ✅ Successful: {results['successful']}")
+        print(f"   ❌ Failed: {results['failed']}")
+        print(f"   📦 Total: {results['total_processed']}")
+        
+        return results
     
-    def _save_listing_info(self, sku: str, listing_data: Dict[str, Any]):
-        """Save eBay listing information"""
-        listings_file = 'ebay_listings.json'
+    def _feed_csv_chunks(self, inventory_products: List[Dict[str, Any]]
+                         ) -> Iterator[Tuple[List[Dict[str, Any]], bytes]]:
+        """Split products into feed CSV files that stay under eBay's upload size limit"""
+        header = _csv_line(FEED_CSV_HEADER)
+        chunk_products, chunk_lines, chunk_size = [], [header], len(header)
         
-        # Load existing listings
-        if os.path.exists(listings_file):
-            with open(listings_file, 'r') as f:
-                listings = json.load(f)
-        else:
-            listings = {'listings': {}, 'last_updated': None}
+        for product in inventory_products:
+            line = _csv_line(self._feed_csv_row(product))
+            if chunk_products and chunk_size + len(line) > FEED_MAX_FILE_BYTES:
+                yield chunk_products, b''.join(chunk_lines)
+                chunk_products, chunk_lines, chunk_size = [], [header], len(header)
+            chunk_products.append(product)
+            chunk_lines.append(line)
+            chunk_size += len(line)
+        
+        if chunk_products:
+            yield chunk_products, b''.join(chunk_lines)
+    
+    def _feed_csv_row(self, product_data: Dict[str, Any]) -> Tuple[Any, ...]:
+        """File Exchange CSV row (matching FEED_CSV_HEADER) that adds one listing"""
+        artifacts = self._build_listing_artifacts(product_data)
+        # Same condition mapping, description and images as the per-SKU inventory item
+        ebay_item = self.ebay_api.build_inventory_item(product_data)
+        
+        return (
+            'Add',
+            product_data.get('sku', ''),
+            artifacts['template']['category_id'],
+            artifacts['title'],
+            EBAY_CONDITION_IDS[ebay_item['condition']],
+            ebay_item['product']['description'],
+            'FixedPrice',
+            'GTC',
+            f"{artifacts['price']:.2f}",
+            1,
+            'United States',
+            '|'.join(ebay_item['product']['imageUrls'])
+        )
+    
+    def _run_feed_task(self, file_name: str, content: bytes,
+                       poll_interval: float, timeout: float) -> Dict[str, Any]:
+        """Create a feed task, upload its file and wait for eBay to finish processing it"""
+        created = self.ebay_api.create_feed_task(FEED_TYPE, FEED_SCHEMA_VERSION)
+        if not created.get('success'):
+            return {'task_id': None, 'status': 'NOT_CREATED', 'error': created.get('error')}
+        
+        task_id = created['task_id']
+        uploaded = self.ebay_api.upload_feed_file(task_id, file_name, content)
+        if not uploaded.get('success'):
+            return {'task_id': task_id, 'status': 'UPLOAD_FAILED', 'error': uploaded.get('error')}
+        
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            task = self.ebay_api.get_feed_task(task_id)
+            if task.get('success') and task['status'] in FEED_FINAL_STATUSES:
+                return {'task_id': task_id, 'status': task['status'], 'error': None}
+            time.sleep(poll_interval)
         
-        # Add new listing
-        listings['listings'][sku] = {
+        return {'task_id': task_id, 'status': 'TIMED_OUT',
+                'error': f"Feed task {task_id} did not finish within {timeout:.0f}s"}
+    
+    def _select_template(self, product_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Select appropriate listing template (name and template) based on product data"""
+        # Leading digits as before ("1985-1990" and two-digit "85" both parse); approximate
+        # years like "c.1985" fall back to their first four-digit run
+        year = str(product_data.get('year', ''))
+        try:
+            year_int = int(year[:4]) if year else 0
+        except ValueError:
+            year_match = YEAR_RE.search(year)
+            year_int = int(year_match.group()) if year_match else 0
+        
+        template_key = _resolve_template_key(
+            product_data.get('medium', '').lower(),
+            product_data.get('edition_type', '').lower(),
+            year_int
+        )
+        return template_key, self.listing_templates[template_key]
+    
+    def _save_listing_info(self, sku: str, listing_data: Dict[str, Any]):
+        """Save eBay listing information"""
+        record = {
             **listing_data,
             'created_at': datetime.now().isoformat(),
             'gallery': 'Gauntlet Gallery'
         }
-        listings['last_updated'] = datetime.now().isoformat()
+        line = json_dumps({'sku': sku, 'listing': record}) + b'\n'
+        
+        # Append to the live log; _compact_listings moves it aside before folding it in,
+        # so appends never land in a file that is about to be deleted
+        with _listings_files_lock(exclusive=False):
+            with open(LISTINGS_LOG_FILE, 'ab') as f:
+                f.write(line)
+                log_size = f.tell()
+        
+        # Keep the log that readers overlay small
+        if log_size > LISTINGS_LOG_COMPACT_BYTES:
+            self._compact_listings()
+    
+    def _compact_listings(self):
+        """Fold logged listings into the listings file"""
+        with _listings_files_lock(exclusive=True):
+            # Move the live log aside; appends from here on start a fresh log
+            try:
+                os.replace(LISTINGS_LOG_FILE,
+                           f"{LISTINGS_LOG_FILE}.{uuid.uuid4().hex}{LOG_SNAPSHOT_SUFFIX}")
+            except FileNotFoundError:
+                pass
+            
+            # Includes snapshots left behind by an interrupted compaction
+            snapshots = _log_snapshots()
+            if not snapshots:
+                return
+            
+            # Load existing listings
+            try:
+                with open(LISTINGS_FILE, 'rb') as f:
+                    listings = json_loads(f.read())
+            except FileNotFoundError:
+                listings = {'listings': {}, 'last_updated': None}
+            
+            for path in snapshots:
+                with open(path, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = json_loads(line)
+                        except ValueError:
+                            continue  # Blank or torn line from an interrupted write
+                        listings['listings'][entry['sku']] = entry['listing']
+                        listings['last_updated'] = entry['listing']['created_at']
+            
+            # Swap the new file in atomically, then drop the folded snapshots
+            fd, tmp_path = tempfile.mkstemp(prefix='.ebay_listings.', suffix='.tmp', dir='.')
+            try:
+                os.chmod(tmp_path, 0o644)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(json_dumps(listings, indent=True))
+                os.replace(tmp_path, LISTINGS_FILE)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            for path in snapshots:
+                os.remove(path)
+    
+    def _load_listings_index(self) -> Dict[str, Any]:
+        """Listings by SKU: the listings file overlaid with entries still in the log"""
+        # Read-only: the log is overlaid in memory, never folded in here. If a compaction
+        # swaps the listings file in mid-read, read again so no entry falls in between.
+        while True:
+            listings_key = _file_key(LISTINGS_FILE)
+            listings = self._load_listings_file(listings_key)
+            pending = self._pending_listings()
+            if _file_key(LISTINGS_FILE) == listings_key:
+                break
+        return {**listings, **pending} if pending else listings
+    
+    def _load_listings_file(self, file_key: Optional[Tuple[int, int, int]]) -> Dict[str, Any]:
+        """Listings from the listings file, re-read only when it has changed on disk"""
+        with self._listings_lock:
+            if file_key != self._listings_file_key:
+                try:
+                    with open(LISTINGS_FILE, 'rb') as f:
+                        self._listings_index = json_loads(f.read()).get('listings', {})
+                except FileNotFoundError:
+                    self._listings_index = {}
+                self._listings_file_key = file_key
+            return self._listings_index
+    
+    def _pending_listings(self) -> Dict[str, Any]:
+        """Listings logged but not yet compacted (snapshots first, then the live log)"""
+        # Read the live log before listing snapshots: a compaction that moves it aside
+        # in between then leaves it among the snapshots instead of hiding it
+        live = self._read_log(LISTINGS_LOG_FILE)
+        snapshots = [(path, self._read_log(path)) for path in _log_snapshots()]
         
-        # Save
-        with open(listings_file, 'w') as f:
-            json.dump(listings, f, indent=2)
+        entries_by_path = {}
+        pending = {}
+        for path, cached in snapshots:
+            if cached is not None:
+                entries_by_path[path] = cached
+                pending.update(cached[1])
+        if live is not None:
+            entries_by_path[LISTINGS_LOG_FILE] = live
+            # If the log was moved aside since it was read, its snapshot (which may hold
+            # later appends) already covers it
+            if not any(cached and cached[0][0] == live[0][0] for _, cached in snapshots):
+                pending.update(live[1])
+        self._log_entries = entries_by_path
+        return pending
+    
+    def _read_log(self, path: str) -> Optional[Tuple[Tuple[int, int, int], Dict[str, Any]]]:
+        """(file key, {sku: listing}) for a listings log, re-read only when it has changed"""
+        file_key = _file_key(path)
+        if file_key is None:
+            return None
+        cached = self._log_entries.get(path)
+        if cached is not None and cached[0] == file_key:
+            return cached
+        entries = {}
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json_loads(line)
+                    except ValueError:
+                        continue  # Blank or torn line from an interrupted write
+                    entries[entry['sku']] = entry['listing']
+        except FileNotFoundError:
+            return None  # Folded in by a compaction since the stat above
+        return (file_key, entries)
     
     def get_listing_status(self, sku: str) -> Dict[str, Any]:
         """Get status of eBay listing"""
         try:
-            listings_file = 'ebay_listings.json'
-            if os.path.exists(listings_file):
-                with open(listings_file, 'r') as f:
-                    listings = json.load(f)
-                
-                if sku in listings.get('listings', {}):
-                    return {'success': True, 'listing': listings['listings'][sku]}
+            listings = self._load_listings_index()
+            if sku in listings:
+                return {'success': True, 'listing': listings[sku]}
             
             return {'success': False, 'error': 'Listing not found'}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def get_all_listings(self) -> Dict[str, Any]:
-        """Get all eBay listings"""
+    def get_all_listings(self, stream: bool = False) -> Dict[str, Any]:
+        """Get all eBay listings (as a lazy iterator of (sku, listing) pairs if stream is set)"""
         try:
-            listings_file = 'ebay_listings.json'
-            if os.path.exists(listings_file):
-                with open(listings_file, 'r') as f:
-                    listings = json.load(f)
-                return {'success': True, 'listings': listings.get('listings', {})}
-            else:
-                return {'success': True, 'listings': {}}
+            if stream:
+                return {'success': True, 'listings': self.iter_listings()}
+            return {'success': True, 'listings': dict(self._load_listings_index())}
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def iter_listings(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (sku, listing) pairs, streaming the listings file when ijson is installed"""
+        if not IJSON_AVAILABLE:
+            yield from self._load_listings_index().items()
+            return
+        
+        # Parse incrementally so large listing files never have to be held in memory at once;
+        # logged listings are overlaid, superseding any older copy in the file
+        pending = self._pending_listings()
+        try:
+            f = open(LISTINGS_FILE, 'rb')
+        except FileNotFoundError:
+            f = None
+        if f is not None:
+            with f:
+                for sku, listing in ijson.kvitems(f, 'listings', use_float=True):
+                    if sku not in pending:
+                        yield sku, listing
+        yield from pending.items()
+    
+    def _build_listing_artifacts(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Template, title, keywords, price and fees for a product (shared by preview and create)"""
+        key = tuple(product_data.get(field, _MISSING) for field in ARTIFACT_FIELDS)
+        try:
+            return self._cached_listing_artifacts(key)
+        except TypeError:
+            # Unhashable field values can't be cached; compute directly
+            return self._compute_listing_artifacts(product_data)
+    
+    def _listing_artifacts_for_key(self, key: Tuple[Any, ...]) -> Dict[str, Any]:
+        """Rebuild the relevant product fields from a cache key and compute the artifacts"""
+        product_data = {field: value for field, value in zip(ARTIFACT_FIELDS, key) if value is not _MISSING}
+        return self._compute_listing_artifacts(product_data)
+    
+    def _compute_listing_artifacts(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute the listing pieces that depend only on the product data"""
+        template_type, template = self._select_template(product_data)
+        
+        # Generate title
+        title_vars = {
+            'artist': product_data.get('artist', 'Unknown Artist'),
+            'title': product_data.get('title', 'Artwork'),
+            'medium': product_data.get('medium', 'Mixed Media'),
+            'year': product_data.get('year', '2024'),
+            'edition': product_data.get('edition', '')
+        }
+        
+        ebay_title = self._title_formatters[template_type](title_vars)
+        
+        # Truncate title if too long (eBay 80 char limit)
+        if len(ebay_title) > 80:
+            ebay_title = ebay_title[:77] + "..."
+        
+        # Generate keywords (template keywords are prepared once in __init__)
+        product_keywords = (product_data.get('artist', '').lower(), product_data.get('style', '').lower())
+        keywords = (
+            *self._template_keywords[template_type],
+            *(k for k in product_keywords if k),  # Skip missing artist/style
+            *GALLERY_KEYWORDS
+        )
+        
+        price = float(product_data.get('sale_price', 100))
+        fees = self._calculate_ebay_fees(price)
+        
+        return {
+            'template_type': template_type,
+            'template': template,
+            'title': ebay_title,
+            'keywords': ', '.join(keywords[:10]),  # Limit keywords
+            'price': price,
+            'fees': fees
+        }
+    
     def generate_listing_preview(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate preview of how the eBay listing will look"""
         try:
-            template = self._select_template(product_data)
-            
-            # Generate title
-            title_vars = {
-                'artist': product_data.get('artist', 'Unknown Artist'),
-                'title': product_data.get('title', 'Artwork'),
-                'medium': product_data.get('medium', 'Mixed Media'),
-                'year': product_data.get('year', '2024'),
-                'edition': product_data.get('edition', '')
-            }
-            
-            ebay_title = template['title_template'].format(**title_vars)
-            
-            # Truncate title if too long (eBay 80 char limit)
-            if len(ebay_title) > 80:
-                ebay_title = ebay_title[:77] + "..."
-            
-            # Generate keywords
-            keywords = template['keywords'] + [
-                product_data.get('artist', '').lower(),
-                product_data.get('style', '').lower(),
-                'gauntlet gallery',
-                'art'
-            ]
-            keywords = [k for k in keywords if k]  # Remove empty strings
+            artifacts = self._build_listing_artifacts(product_data)
             
             preview = {
-                'title': ebay_title,
+                'title': artifacts['title'],
                 'price': f"${product_data.get('sale_price', 100):.2f}",
                 'condition': product_data.get('condition', 'Good'),
                 'category': 'Art > Paintings',
-                'keywords': ', '.join(keywords[:10]),  # Limit keywords
-                'template_type': list(self.listing_templates.keys())[list(self.listing_templates.values()).index(template)],
-                'estimated_fees': self._calculate_ebay_fees(float(product_data.get('sale_price', 100))),
-                'profit_estimate': self._calculate_profit(product_data)
+                'keywords': artifacts['keywords'],
+                'template_type': artifacts['template_type'],
+                # A copy, so callers can't modify the cached artifacts
+                'estimated_fees': dict(artifacts['fees']),
+                # Only previews need the cost, so a missing or blank one never blocks creation
+                'profit_estimate': self._calculate_profit(product_data, artifacts['fees'])
             }
             
             return {'success': True, 'preview': preview}
@@ -260,31 +733,73 @@ class eBayListingAutomation:
     
     def _calculate_ebay_fees(self, price: float) -> Dict[str, float]:
         """Calculate estimated eBay fees"""
-        # eBay fee structure (approximate for art category)
-        insertion_fee = 0.30  # First listing free, then $0.30
-        final_value_fee_rate = 0.125  # 12.5% for most categories
-        final_value_fee = price * final_value_fee_rate
+        final_value_fee = price * FINAL_VALUE_FEE_RATE
+        payment_fee = (price * PAYMENT_FEE_RATE) + PAYMENT_FEE_FIXED
         
-        # PayPal/Payment processing (approximate)
-        payment_fee_rate = 0.029  # 2.9% + $0.30
-        payment_fee = (price * payment_fee_rate) + 0.30
-        
-        total_fees = insertion_fee + final_value_fee + payment_fee
+        total_fees = INSERTION_FEE + final_value_fee + payment_fee
         
         return {
-            'insertion_fee': insertion_fee,
+            'insertion_fee': INSERTION_FEE,
             'final_value_fee': final_value_fee,
             'payment_processing': payment_fee,
             'total_fees': total_fees,
             'net_amount': price - total_fees
         }
     
-    def _calculate_profit(self, product_data: Dict[str, Any]) -> Dict[str, float]:
-        """Calculate profit estimates"""
+    def _calculate_fees_batch(self, prices: Sequence[float]) -> Dict[str, Any]:
+        """Calculate estimated eBay fees for many prices at once (one array/list per fee)"""
+        if not NUMPY_AVAILABLE:
+            rows = [self._calculate_ebay_fees(price) for price in prices]
+            return {key: [row[key] for row in rows] for key in FEE_KEYS}
+        
+        prices = np.asarray(prices, dtype=np.float64)
+        final_value_fee = prices * FINAL_VALUE_FEE_RATE
+        payment_fee = (prices * PAYMENT_FEE_RATE) + PAYMENT_FEE_FIXED
+        total_fees = INSERTION_FEE + final_value_fee + payment_fee
+        
+        return {
+            'insertion_fee': np.full_like(prices, INSERTION_FEE),
+            'final_value_fee': final_value_fee,
+            'payment_processing': payment_fee,
+            'total_fees': total_fees,
+            'net_amount': prices - total_fees
+        }
+    
+    def _calculate_profit_batch(self, prices: Sequence[float], costs: Sequence[float]) -> Dict[str, Any]:
+        """Calculate profit estimates for many products at once (one array/list per figure)"""
+        fees = self._calculate_fees_batch(prices)
+        if not NUMPY_AVAILABLE:
+            rows = [
+                self._calculate_profit({'sale_price': price, 'cost': cost},
+                                       {'net_amount': net_amount, 'total_fees': total_fees})
+                for price, cost, net_amount, total_fees
+                in zip(prices, costs, fees['net_amount'], fees['total_fees'])
+            ]
+            return {key: [row[key] for row in rows] for key in PROFIT_KEYS}
+        
+        prices = np.asarray(prices, dtype=np.float64)
+        costs = np.asarray(costs, dtype=np.float64)
+        net_profit = fees['net_amount'] - costs
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_margin = np.where(prices > 0, net_profit / prices * 100, 0.0)
+        
+        return {
+            'cost': costs,
+            'sale_price': prices,
+            'gross_profit': prices - costs,
+            'net_profit': net_profit,
+            'profit_margin': profit_margin,
+            'fees_total': fees['total_fees']
+        }
+    
+    def _calculate_profit(self, product_data: Dict[str, Any],
+                          fees: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Calculate profit estimates (pass fees if they were already calculated)"""
         cost = float(product_data.get('cost', 0))
         sale_price = float(product_data.get('sale_price', 100))
         
-        fees = self._calculate_ebay_fees(sale_price)
+        if fees is None:
+            fees = self._calculate_ebay_fees(sale_price)
         net_amount = fees['net_amount']
         
         gross_profit = sale_price - cost
@@ -5,21 +5,27 @@ Integrates Google Drive, multiple AI models including Grok, and auto-fills inven
 """
 
 import os
+import re
 import json
 import base64
 import hashlib
 import uuid
 import io
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
+from functools import cached_property, lru_cache
 from flask import Flask, render_template_string, request, jsonify, send_file
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from PIL import Image
+from PIL import Image, ImageOps
 import imagehash
 
 # Google API imports
@@ -29,6 +35,8 @@ try:
     from google.auth.transport.requests import Request
     from googleapiclient.discovery import build
     from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+    from google_auth_httplib2 import AuthorizedHttp
+    import httplib2
     import pickle
     GOOGLE_AVAILABLE = True
 except ImportError:
@@ -54,6 +62,150 @@ try:
 except ImportError:
     GEMINI_AVAILABLE = False
 
+# orjson is optional; fall back to the stdlib encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def json_dumps(data: Any, indent: bool = False, default=None) -> bytes:
+    """Encode data as UTF-8 JSON bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=default, option=orjson.OPT_INDENT_2 if indent else None)
+    return json.dumps(data, indent=2 if indent else None, default=default).encode()
+
+def json_loads(data) -> Any:
+    """Decode JSON text or bytes, using orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _base36(n: int) -> str:
+    """Upper-case base-36 form of a non-negative integer"""
+    digits = []
+    while n:
+        n, r = divmod(n, 36)
+        digits.append(BASE36_DIGITS[r])
+    return ''.join(reversed(digits)) or '0'
+
+@lru_cache(maxsize=8)
+def _read_json_file(path: str, file_key: Tuple[int, int, int]) -> Dict:
+    """Parse a JSON file; file_key ties the cached result to one version of it"""
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
+
+def _load_json_config(path: str) -> Optional[Dict]:
+    """Copy of a JSON config file, parsed again only when it changes; None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return dict(_read_json_file(path, (st.st_ino, st.st_mtime_ns, st.st_size)))
+
+# Vision backends queried per artwork, in merge priority order:
+# (models key, confidence label, analyzer method, name used in error messages)
+AI_BACKENDS = (
+    ('gpt-4-vision', 'gpt-4', '_analyze_with_gpt4', 'GPT-4'),
+    ('claude-3-opus', 'claude-3', '_analyze_with_claude', 'Claude'),
+    ('gemini-pro-vision', 'gemini', '_analyze_with_gemini', 'Gemini'),
+    ('grok-2-vision', 'grok', '_analyze_with_grok', 'Grok'),
+)
+
+# Vision APIs downscale internally, so larger uploads only cost bandwidth
+VISION_MAX_EDGE = 1536
+VISION_JPEG_QUALITY = 85
+VISION_CACHE_DIR = os.path.join('cache', 'vision')
+
+# Analyses are reused for images whose perceptual hashes differ by at most this many bits;
+# a near match is likely another photo or copy of the same work, so only fields
+# describing the work itself carry over
+ANALYSIS_CACHE_DIR = os.path.join('cache', 'ai_analysis')
+ANALYSIS_CACHE_MAX_DISTANCE = 4
+ANALYSIS_CACHE_TTL = 30 * 24 * 3600
+ANALYSIS_CACHE_SHARED_FIELDS = ('artist', 'title', 'series', 'year', 'medium')
+
+# Prompt sent with the image to every vision model
+ANALYSIS_PROMPT = """Analyze this artwork and provide detailed information in JSON format:
+        {
+            "title": "artwork title or 'Untitled'",
+            "artist": "artist name or 'Unknown'",
+            "series": "series name if part of series",
+            "year": "creation year or estimated period",
+            "edition": "edition info (e.g., '25/100', 'AP', 'Open Edition')",
+            "medium": "medium/technique used",
+            "size": "dimensions in inches or cm",
+            "style": "art style/movement",
+            "period": "art period",
+            "description": "detailed description for listing",
+            "keywords": ["relevant", "search", "keywords"],
+            "tags": ["category", "tags"],
+            "condition": "condition assessment",
+            "estimated_value": {"min": 0, "max": 0},
+            "market_appeal": "assessment of market demand",
+            "rarity": "rarity level",
+            "visual_elements": ["key", "visual", "elements"],
+            "authenticity_markers": ["signs", "of", "authenticity"],
+            "provenance": "provenance if visible"
+        }
+        Provide your best assessment even if uncertain."""
+
+# Outermost {...} span in a model reply
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# Digits of the timestamp part of generated SKUs
+BASE36_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Characters removed from (or replaced in) generated filenames
+FILENAME_TABLE = str.maketrans({**dict.fromkeys('<>:"/\\|?*'), ' ': '_'})
+MULTI_UNDERSCORE_RE = re.compile(r'__+')
+
+# Files considered when looking for related images of an artwork
+RELATED_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff')
+
+# OAuth token for Drive/Sheets; token.pickle is only read to migrate old installs
+GOOGLE_TOKEN_FILE = 'token.json'
+LEGACY_GOOGLE_TOKEN_FILE = 'token.pickle'
+
+# Related images uploaded per product, and how many go up at once
+MAX_RELATED_UPLOADS = 10
+DRIVE_UPLOAD_WORKERS = 8
+
+# Larger files go up in resumable chunks so a dropped connection only resends one chunk
+DRIVE_RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+DRIVE_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Analysis stops waiting for slower models once this many agree on these fields
+# (override with ai_models.consensus_models in system_config.json)
+CONSENSUS_MODELS = 2
+CONSENSUS_FIELDS = ('artist', 'title')
+
+@dataclass
+class VisionImage:
+    """An artwork image read once and shared by every vision backend"""
+    raw: bytes
+    b64: str
+    
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'VisionImage':
+        return cls(raw=raw, b64=base64.b64encode(raw).decode('ascii'))
+        
+    @cached_property
+    def image(self) -> Image.Image:
+        """Decoded image, opened on first use (only Gemini takes a PIL image)"""
+        return Image.open(io.BytesIO(self.raw))
+
+def _downscale_for_vision(source) -> bytes:
+    """JPEG bytes of an image (path or file object) shrunk to VISION_MAX_EDGE"""
+    with Image.open(source) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ('RGB', 'L'):
+            im = im.convert('RGB')
+        im.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+        buf = io.BytesIO()
+        im.save(buf, 'JPEG', quality=VISION_JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
 app = Flask(__name__)
 CORS(app)
 
@@ -77,15 +229,25 @@ class EnhancedAIManager:
         }
         self.initialize_clients()
         
+        # Perceptual hashes of cached analyses, keyed by their hex form
+        self._analysis_cache_lock = threading.Lock()
+        self._analysis_hashes = {}
+        if os.path.isdir(ANALYSIS_CACHE_DIR):
+            for entry in os.scandir(ANALYSIS_CACHE_DIR):
+                if entry.name.endswith('.json'):
+                    key = entry.name[:-5]
+                    try:
+                        self._analysis_hashes[key] = imagehash.hex_to_hash(key)
+                    except ValueError:
+                        continue
+        
     def load_system_config(self):
         """Load system configuration"""
         config_file = 'data/system_config.json'
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading system config: {e}")
+        try:
+            return _load_json_config(config_file) or {}
+        except Exception as e:
+            print(f"Error loading system config: {e}")
         return {}
         
     def initialize_clients(self):
@@ -99,10 +261,65 @@ class EnhancedAIManager:
         if self.models['gemini-pro-vision']['api_key'] and GEMINI_AVAILABLE:
             genai.configure(api_key=self.models['gemini-pro-vision']['api_key'])
             
+        # Grok is called over plain HTTPS; keep the connection alive between artworks
+        self.xai_session = self._create_session()
+        
+    def _create_session(self) -> requests.Session:
+        """Create an HTTP session that reuses connections to the xAI API"""
+        session = requests.Session()
+        # Retry transient failures; urllib3 only retries idempotent methods, so POSTs are not replayed.
+        # Once retries run out, hand back the last response instead of raising RetryError
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10, max_retries=retry)
+        session.mount('https://', adapter)
+        return session
+            
     def analyze_artwork_multimodel(self, image_path: str) -> Dict:
         """Use multiple AI models to analyze artwork and extract all fields"""
+        # Prepare and encode the image once for all backends
+        vision_image = self._prepare_vision_payload(image_path)
+        return self._analyze_vision_image(vision_image, image_path)
+        
+    def analyze_artwork_bytes(self, image_bytes: bytes, name: str = 'upload') -> Dict:
+        """Analyze an image that is already in memory, such as a fresh upload"""
+        try:
+            vision_image = VisionImage.from_bytes(_downscale_for_vision(io.BytesIO(image_bytes)))
+        except Exception as e:
+            print(f"Could not downscale {name}: {e}")
+            vision_image = VisionImage.from_bytes(image_bytes)
+        return self._analyze_vision_image(vision_image, name)
         
-        combined_analysis = {
+    def _analyze_vision_image(self, vision_image: VisionImage, name: str) -> Dict:
+        """Answer from the analysis cache, or query the models and cache their answer"""
+        # Re-runs and near-duplicate photos reuse an earlier analysis
+        try:
+            phash = imagehash.phash(vision_image.image)
+        except Exception as e:
+            print(f"Could not hash {name}: {e}")
+            phash = None
+        if phash is not None:
+            cached = self._load_cached_analysis(phash)
+            if cached is not None:
+                return cached
+                
+        combined_analysis = self._analyze_with_all_models(vision_image)
+        # Keep consensus answers and answers every queried model contributed to;
+        # one model answering while the others failed is not worth keeping
+        models_used = combined_analysis['models_used']
+        complete = combined_analysis['consensus'] or len(models_used) == len(combined_analysis['models_queried'])
+        if phash is not None and models_used and complete:
+            self._save_cached_analysis(phash, combined_analysis)
+        return combined_analysis
+        
+    def _active_backends(self) -> List[Tuple[str, str, str, str]]:
+        """AI_BACKENDS entries whose client library is installed and that have an API key"""
+        return [b for b in AI_BACKENDS if self.models[b[0]]['active'] and self.models[b[0]]['api_key']]
+        
+    @staticmethod
+    def _empty_analysis() -> Dict:
+        """Analysis fields before any model has answered"""
+        return {
             'title': '',
             'artist': '',
             'series': '',
@@ -127,67 +344,159 @@ class EnhancedAIManager:
             'ai_confidence': {}
         }
         
-        # Try each model and combine results
-        models_tried = []
+    def _analyze_with_all_models(self, vision_image: VisionImage) -> Dict:
+        """Query every active backend and merge their answers"""
+        combined_analysis = self._empty_analysis()
         
-        # GPT-4 Vision
-        if self.models['gpt-4-vision']['active']:
+        # The providers are independent network calls, so query them side by side;
+        # results are merged afterwards in AI_BACKENDS order so precedence never
+        # depends on which provider answered first
+        backends = self._active_backends()
+        models_tried = []
+        answers = {}
+        consensus = False
+        executor = ThreadPoolExecutor(max_workers=max(len(backends), 1))
+        try:
+            futures = {
+                executor.submit(getattr(self, method), vision_image): label
+                for _, label, method, _ in backends
+            }
+            # Stop waiting once enough models agree; slower replies are discarded
+            for future in as_completed(futures):
+                answers[futures[future]] = future
+                if self._has_consensus(answers.values()):
+                    consensus = True
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+        for _, label, _, name in backends:
+            if label not in answers:
+                continue
             try:
-                gpt_result = self._analyze_with_gpt4(image_path)
-                self._merge_analysis(combined_analysis, gpt_result, 'gpt-4')
-                models_tried.append('gpt-4')
+                result = answers[label].result()
+                self._merge_analysis(combined_analysis, result, label)
+                # Backends report their own errors by returning nothing
+                if result and any(result.values()):
+                    models_tried.append(label)
             except Exception as e:
-                print(f"GPT-4 error: {e}")
+                print(f"{name} error: {e}")
                 
-        # Claude 3 Opus
-        if self.models['claude-3-opus']['active']:
-            try:
-                claude_result = self._analyze_with_claude(image_path)
-                self._merge_analysis(combined_analysis, claude_result, 'claude-3')
-                models_tried.append('claude-3')
-            except Exception as e:
-                print(f"Claude error: {e}")
+        combined_analysis['models_used'] = models_tried
+        combined_analysis['models_queried'] = [label for _, label, _, _ in backends]
+        combined_analysis['consensus'] = consensus
+        combined_analysis['analysis_timestamp'] = datetime.now().isoformat()
+        
+        return combined_analysis
+        
+    def _load_cached_analysis(self, phash) -> Optional[Dict]:
+        """Return the stored analysis for this image, or the work's fields from a near-identical one"""
+        with self._analysis_cache_lock:
+            exact = str(phash) in self._analysis_hashes
+            if exact:
+                key = str(phash)
+            else:
+                key, best = None, ANALYSIS_CACHE_MAX_DISTANCE + 1
+                for other_key, other in self._analysis_hashes.items():
+                    distance = phash - other
+                    if distance < best:
+                        key, best = other_key, distance
+            if key is None:
+                return None
                 
-        # Gemini Pro Vision
-        if self.models['gemini-pro-vision']['active']:
+            cache_path = os.path.join(ANALYSIS_CACHE_DIR, f"{key}.json")
             try:
-                gemini_result = self._analyze_with_gemini(image_path)
-                self._merge_analysis(combined_analysis, gemini_result, 'gemini')
-                models_tried.append('gemini')
-            except Exception as e:
-                print(f"Gemini error: {e}")
+                if time.time() - os.stat(cache_path).st_mtime > ANALYSIS_CACHE_TTL:
+                    os.remove(cache_path)
+                    del self._analysis_hashes[key]
+                    return None
+                with open(cache_path, 'rb') as f:
+                    cached = json_loads(f.read())
+            except (OSError, ValueError):
+                self._analysis_hashes.pop(key, None)
+                return None
+                
+        # Backends enabled since the entry was stored haven't had their say yet
+        active = {label for _, label, _, _ in self._active_backends()}
+        if active - set(cached.get('models_queried', cached.get('models_used', []))):
+            return None
+        if exact:
+            return cached
+        # Edition, condition, value and the like belong to the pictured copy, not the work
+        analysis = self._empty_analysis()
+        for field in ANALYSIS_CACHE_SHARED_FIELDS:
+            analysis[field] = cached.get(field, analysis[field])
+        analysis['models_used'] = []
+        analysis['analysis_timestamp'] = datetime.now().isoformat()
+        return analysis
                 
-        # Grok 2 Vision
-        if self.models['grok-2-vision']['active']:
+    def _save_cached_analysis(self, phash, analysis: Dict):
+        """Persist an analysis under the image's perceptual hash"""
+        key = str(phash)
+        os.makedirs(ANALYSIS_CACHE_DIR, exist_ok=True)
+        cache_path = os.path.join(ANALYSIS_CACHE_DIR, f"{key}.json")
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps(analysis))
+        os.replace(tmp_path, cache_path)
+        with self._analysis_cache_lock:
+            self._analysis_hashes[key] = phash
+            
+    def _has_consensus(self, futures) -> bool:
+        """Whether enough finished models name the same artist and title"""
+        needed = self.system_config.get('ai_models', {}).get('consensus_models', CONSENSUS_MODELS)
+        votes = {}
+        for future in futures:
+            if future.exception() is not None:
+                continue
+            result = future.result() or {}
+            key = tuple(str(result.get(field) or '').strip().lower() for field in CONSENSUS_FIELDS)
+            if all(key):
+                votes[key] = votes.get(key, 0) + 1
+                if votes[key] >= needed:
+                    return True
+        return False
+        
+    def _prepare_vision_payload(self, image_path: str) -> VisionImage:
+        """Downscale and recompress an image for the vision APIs, cached per file version"""
+        stat = os.stat(image_path)
+        key = hashlib.sha1(
+            f"{os.path.abspath(image_path)}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+        ).hexdigest()
+        cache_path = os.path.join(VISION_CACHE_DIR, f"{key}.jpg")
+        
+        try:
+            raw = Path(cache_path).read_bytes()
+        except FileNotFoundError:
             try:
-                grok_result = self._analyze_with_grok(image_path)
-                self._merge_analysis(combined_analysis, grok_result, 'grok')
-                models_tried.append('grok')
+                raw = _downscale_for_vision(image_path)
             except Exception as e:
-                print(f"Grok error: {e}")
+                # Let the APIs see the original file if Pillow can't decode it
+                print(f"Could not downscale {image_path}: {e}")
+                return VisionImage.from_bytes(Path(image_path).read_bytes())
                 
-        combined_analysis['models_used'] = models_tried
-        combined_analysis['analysis_timestamp'] = datetime.now().isoformat()
-        
-        return combined_analysis
+            os.makedirs(VISION_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, cache_path)
+            
+        return VisionImage.from_bytes(raw)
         
-    def _analyze_with_gpt4(self, image_path: str) -> Dict:
+    def _analyze_with_gpt4(self, vision_image: VisionImage) -> Dict:
         """Analyze with GPT-4 Vision"""
         if not hasattr(self, 'openai_client'):
             print("OpenAI client not initialized")
             return {}
             
-        with open(image_path, 'rb') as img:
-            image_data = base64.b64encode(img.read()).decode()
-            
         try:
             response = self.openai_client.chat.completions.create(
                 model="gpt-4o",
                 messages=[{
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": self._get_analysis_prompt()},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}}
+                        {"type": "text", "text": ANALYSIS_PROMPT},
+                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{vision_image.b64}"}}
                     ]
                 }],
                 max_tokens=1000
@@ -198,15 +507,12 @@ class EnhancedAIManager:
             print(f"GPT-4 Vision error: {e}")
             return {}
         
-    def _analyze_with_claude(self, image_path: str) -> Dict:
+    def _analyze_with_claude(self, vision_image: VisionImage) -> Dict:
         """Analyze with Claude 3 Opus"""
         if not hasattr(self, 'anthropic'):
             print("Anthropic client not initialized")
             return {}
             
-        with open(image_path, 'rb') as img:
-            image_data = base64.b64encode(img.read()).decode()
-            
         try:
             message = self.anthropic.messages.create(
                 model="claude-3-opus-20240229",
@@ -214,8 +520,8 @@ class EnhancedAIManager:
                 messages=[{
                     "role": "user",
                     "content": [
-                        {"type": "text", "text": self._get_analysis_prompt()},
-                        {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": image_data}}
+                        {"type": "text", "text": ANALYSIS_PROMPT},
+                        {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": vision_image.b64}}
                     ]
                 }]
             )
@@ -234,7 +540,7 @@ class EnhancedAIManager:
             print(f"Claude error: {e}")
             return {}
         
-    def _analyze_with_gemini(self, image_path: str) -> Dict:
+    def _analyze_with_gemini(self, vision_image: VisionImage) -> Dict:
         """Analyze with Gemini Pro Vision"""
         if not self.models['gemini-pro-vision']['api_key']:
             print("Gemini API key not available")
@@ -242,15 +548,13 @@ class EnhancedAIManager:
             
         try:
             model = genai.GenerativeModel('gemini-1.5-flash')
-            image = Image.open(image_path)
-            
-            response = model.generate_content([self._get_analysis_prompt(), image])
+            response = model.generate_content([ANALYSIS_PROMPT, vision_image.image])
             return self._parse_ai_response(response.text)
         except Exception as e:
             print(f"Gemini error: {e}")
             return {}
         
-    def _analyze_with_grok(self, image_path: str) -> Dict:
+    def _analyze_with_grok(self, vision_image: VisionImage) -> Dict:
         """Analyze with Grok 2 Vision (xAI)"""
         api_key = self.models['grok-2-vision']['api_key']
         
@@ -259,10 +563,6 @@ class EnhancedAIManager:
             return {}
             
         try:
-            # xAI/Grok API implementation
-            with open(image_path, 'rb') as img:
-                image_data = base64.b64encode(img.read()).decode()
-                
             # Use OpenAI-compatible endpoint for Grok
             headers = {
                 'Authorization': f'Bearer {api_key}',
@@ -274,14 +574,14 @@ class EnhancedAIManager:
                 'messages': [{
                     'role': 'user',
                     'content': [
-                        {'type': 'text', 'text': self._get_analysis_prompt()},
-                        {'type': 'image_url', 'image_url': {'url': f'data:image/jpeg;base64,{image_data}'}}
+                        {'type': 'text', 'text': ANALYSIS_PROMPT},
+                        {'type': 'image_url', 'image_url': {'url': f'data:image/jpeg;base64,{vision_image.b64}'}}
                     ]
                 }],
                 'max_tokens': 1000
             }
             
-            response = requests.post(
+            response = self.xai_session.post(
                 'https://api.x.ai/v1/chat/completions',
                 headers=headers,
                 json=payload,
@@ -300,40 +600,13 @@ class EnhancedAIManager:
             print(f"Grok error: {e}")
             return {}
         
-    def _get_analysis_prompt(self) -> str:
-        """Get comprehensive analysis prompt"""
-        return """Analyze this artwork and provide detailed information in JSON format:
-        {
-            "title": "artwork title or 'Untitled'",
-            "artist": "artist name or 'Unknown'",
-            "series": "series name if part of series",
-            "year": "creation year or estimated period",
-            "edition": "edition info (e.g., '25/100', 'AP', 'Open Edition')",
-            "medium": "medium/technique used",
-            "size": "dimensions in inches or cm",
-            "style": "art style/movement",
-            "period": "art period",
-            "description": "detailed description for listing",
-            "keywords": ["relevant", "search", "keywords"],
-            "tags": ["category", "tags"],
-            "condition": "condition assessment",
-            "estimated_value": {"min": 0, "max": 0},
-            "market_appeal": "assessment of market demand",
-            "rarity": "rarity level",
-            "visual_elements": ["key", "visual", "elements"],
-            "authenticity_markers": ["signs", "of", "authenticity"],
-            "provenance": "provenance if visible"
-        }
-        Provide your best assessment even if uncertain."""
-        
     def _parse_ai_response(self, response: str) -> Dict:
         """Parse AI response to structured data"""
         try:
             # Try to extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            json_match = JSON_OBJECT_RE.search(response)
             if json_match:
-                return json.loads(json_match.group())
+                return json_loads(json_match.group())
         except:
             pass
             
@@ -350,14 +623,14 @@ class EnhancedAIManager:
         
     def _merge_analysis(self, combined: Dict, new_data: Dict, model: str):
         """Merge analysis from one model into combined results"""
-        for key, value in new_data.items():
-            if value and (not combined.get(key) or combined[key] == ''):
-                combined[key] = value
+        # Fill only the fields no earlier model has answered
+        answered = {key: value for key, value in new_data.items() if value}
+        combined.update({key: value for key, value in answered.items() if not combined.get(key)})
                 
         # Track confidence
         if 'ai_confidence' not in combined:
             combined['ai_confidence'] = {}
-        combined['ai_confidence'][model] = len([v for v in new_data.values() if v])
+        combined['ai_confidence'][model] = len(answered)
 
 class GoogleDriveManager:
     """Manage Google Drive and Sheets with image embedding"""
@@ -368,6 +641,12 @@ class GoogleDriveManager:
         self.sheets_service = None
         self.drive_folder_id = None
         
+        # Lowercased image names per upload folder, keyed by the folder's mtime
+        self._upload_index = {}
+        
+        # httplib2 connections are not thread-safe, so each thread gets its own
+        self._local = threading.local()
+        
         if GOOGLE_AVAILABLE:
             self.authenticate()
             
@@ -378,9 +657,14 @@ class GoogleDriveManager:
             'https://www.googleapis.com/auth/spreadsheets'
         ]
         
-        if os.path.exists('token.pickle'):
-            with open('token.pickle', 'rb') as token:
+        save_token = False
+        if os.path.exists(GOOGLE_TOKEN_FILE):
+            self.creds = Credentials.from_authorized_user_file(GOOGLE_TOKEN_FILE, SCOPES)
+        elif os.path.exists(LEGACY_GOOGLE_TOKEN_FILE):
+            # Tokens saved by older versions; rewritten as JSON below
+            with open(LEGACY_GOOGLE_TOKEN_FILE, 'rb') as token:
                 self.creds = pickle.load(token)
+            save_token = True
                 
         if not self.creds or not self.creds.valid:
             if self.creds and self.creds.expired and self.creds.refresh_token:
@@ -389,12 +673,17 @@ class GoogleDriveManager:
                 flow = InstalledAppFlow.from_client_secrets_file(
                     'credentials.json', SCOPES)
                 self.creds = flow.run_local_server(port=0)
+            save_token = True
+            
+        if save_token:
+            # The token grants account access, so keep it private to this user
+            fd = os.open(GOOGLE_TOKEN_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as token:
+                token.write(self.creds.to_json())
                 
-            with open('token.pickle', 'wb') as token:
-                pickle.dump(self.creds, token)
-                
-        self.drive_service = build('drive', 'v3', credentials=self.creds)
-        self.sheets_service = build('sheets', 'v4', credentials=self.creds)
+        # Discovery documents ship with google-api-python-client; no fetch needed
+        self.drive_service = build('drive', 'v3', credentials=self.creds, static_discovery=True)
+        self.sheets_service = build('sheets', 'v4', credentials=self.creds, static_discovery=True)
         
     def set_drive_folder(self, folder_id: str):
         """Set Google Drive folder for image storage"""
@@ -405,27 +694,93 @@ class GoogleDriveManager:
         if not self.drive_service or not self.drive_folder_id:
             return ""
             
-        file_metadata = {
-            'name': filename,
-            'parents': [self.drive_folder_id]
-        }
+        return self._publish_file(self._create_file(image_path, filename))
         
-        media = MediaFileUpload(image_path, mimetype='image/jpeg')
+    def upload_image_bytes_to_drive(self, image_bytes: bytes, filename: str) -> str:
+        """Upload an in-memory image to Google Drive and return shareable link"""
+        if not self.drive_service or not self.drive_folder_id:
+            return ""
+            
+        resumable = len(image_bytes) > DRIVE_RESUMABLE_THRESHOLD
+        media = MediaIoBaseUpload(
+            io.BytesIO(image_bytes), mimetype='image/jpeg',
+            chunksize=DRIVE_UPLOAD_CHUNK_SIZE, resumable=resumable
+        )
+        return self._publish_file(self._create_from_media(media, filename))
         
-        file = self.drive_service.files().create(
-            body=file_metadata,
-            media_body=media,
-            fields='id,webViewLink,webContentLink'
-        ).execute()
+    def _thread_http(self):
+        """Authorized HTTP transport owned by the calling thread"""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.creds, http=httplib2.Http())
+        return http
         
-        # Make file publicly accessible
+    def _publish_file(self, file_id: str) -> str:
+        """Make an uploaded file public and return its direct link"""
         self.drive_service.permissions().create(
-            fileId=file['id'],
+            fileId=file_id,
             body={'type': 'anyone', 'role': 'reader'}
-        ).execute()
+        ).execute(http=self._thread_http())
         
         # Return direct link for embedding
-        return f"https://drive.google.com/uc?id={file['id']}"
+        return f"https://drive.google.com/uc?id={file_id}"
+        
+    def _create_file(self, image_path: str, filename: str) -> str:
+        """Upload one image into the Drive folder and return its file id"""
+        if os.path.getsize(image_path) > DRIVE_RESUMABLE_THRESHOLD:
+            media = MediaFileUpload(
+                image_path, mimetype='image/jpeg',
+                chunksize=DRIVE_UPLOAD_CHUNK_SIZE, resumable=True
+            )
+        else:
+            media = MediaFileUpload(image_path, mimetype='image/jpeg')
+        return self._create_from_media(media, filename)
+        
+    def _create_from_media(self, media, filename: str) -> str:
+        """Create a Drive file from an upload body and return its id"""
+        file_metadata = {
+            'name': filename,
+            'parents': [self.drive_folder_id]
+        }
+        
+        http = self._thread_http()
+        upload = self.drive_service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id'
+        )
+        if not media.resumable():
+            return upload.execute(http=http)['id']
+            
+        file = None
+        while file is None:
+            _, file = upload.next_chunk(http=http)
+        return file['id']
+        
+    def _share_files(self, file_ids: List[str]) -> List[str]:
+        """Make files publicly readable in one batch request; returns the ids that succeeded"""
+        failed = set()
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Error sharing Drive file {request_id}: {exception}")
+                failed.add(request_id)
+                
+        batch = self.drive_service.new_batch_http_request(callback=on_response)
+        for file_id in file_ids:
+            batch.add(
+                self.drive_service.permissions().create(
+                    fileId=file_id,
+                    body={'type': 'anyone', 'role': 'reader'}
+                ),
+                request_id=file_id
+            )
+        try:
+            batch.execute(http=self._thread_http())
+        except Exception as e:
+            print(f"Error sharing Drive files: {e}")
+            return []
+        return [file_id for file_id in file_ids if file_id not in failed]
         
     def add_to_sheets_with_image(self, spreadsheet_id: str, product_data: Dict, image_url: str, related_images: List[str] = None):
         """Add product to Google Sheets with embedded image and related images"""
@@ -526,31 +881,36 @@ class GoogleDriveManager:
         # Get base name for pattern matching
         base_name = self.sanitize_filename(f"{artist}_{title}").lower()
         
-        # Image extensions to search
-        image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff']
-        
         # Search patterns for related images
-        patterns = [
+        patterns = {
             base_name,  # Same artwork
             artist.lower().replace(' ', '_'),  # Same artist
             title.lower().replace(' ', '_'),  # Same title
-        ]
+        }
+        matcher = re.compile('|'.join(map(re.escape, patterns)))
+        main_name = os.path.basename(main_image_path)
         
-        # Scan directory
-        for file in os.listdir(upload_dir):
-            if file == os.path.basename(main_image_path):
-                continue  # Skip the main image
+        for file, file_lower in self._upload_images(upload_dir):
+            if file != main_name and matcher.search(file_lower):
+                related_images.append(os.path.join(upload_dir, file))
                 
-            file_lower = file.lower()
-            
-            # Check if it's an image
-            if any(file_lower.endswith(ext) for ext in image_extensions):
-                # Check if filename matches any pattern
-                if any(pattern in file_lower for pattern in patterns):
-                    related_images.append(os.path.join(upload_dir, file))
-                    
         return related_images
         
+    def _upload_images(self, upload_dir: str) -> Tuple[Tuple[str, str], ...]:
+        """(name, lowercased name) of the image files in a folder, rescanned only when it changes"""
+        mtime = os.stat(upload_dir or '.').st_mtime_ns
+        cached = self._upload_index.get(upload_dir)
+        if cached is None or cached[0] != mtime:
+            images = []
+            with os.scandir(upload_dir or '.') as entries:
+                for entry in entries:
+                    name_lower = entry.name.lower()
+                    if name_lower.endswith(RELATED_IMAGE_EXTENSIONS):
+                        images.append((entry.name, name_lower))
+            cached = (mtime, tuple(images))
+            self._upload_index[upload_dir] = cached
+        return cached[1]
+        
     def upload_related_images_batch(self, related_images: List[str], sku: str) -> List[str]:
         """Upload multiple related images to Google Drive"""
         drive_urls = []
@@ -558,52 +918,35 @@ class GoogleDriveManager:
         if not self.drive_service or not self.drive_folder_id:
             return drive_urls
             
-        for idx, image_path in enumerate(related_images[:10]):  # Limit to 10 related images
-            try:
-                filename = f"{sku}_detail_{idx+1}_{os.path.basename(image_path)}"
-                
-                file_metadata = {
-                    'name': filename,
-                    'parents': [self.drive_folder_id]
-                }
-                
-                media = MediaFileUpload(image_path, mimetype='image/jpeg')
-                
-                file = self.drive_service.files().create(
-                    body=file_metadata,
-                    media_body=media,
-                    fields='id,webViewLink,webContentLink'
-                ).execute()
-                
-                # Make file publicly accessible
-                self.drive_service.permissions().create(
-                    fileId=file['id'],
-                    body={'type': 'anyone', 'role': 'reader'}
-                ).execute()
-                
-                drive_urls.append(f"https://drive.google.com/uc?id={file['id']}")
-                
-            except Exception as e:
-                print(f"Error uploading related image {image_path}: {e}")
-                
+        # Start every upload before waiting on any of them
+        uploads = related_images[:MAX_RELATED_UPLOADS]
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(DRIVE_UPLOAD_WORKERS, len(uploads) or 1)) as executor:
+            futures = {
+                executor.submit(
+                    self._create_file, image_path,
+                    f"{sku}_detail_{idx+1}_{os.path.basename(image_path)}"
+                ): idx
+                for idx, image_path in enumerate(uploads)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    print(f"Error uploading related image {uploads[idx]}: {e}")
+                    
+        # Share all uploads in one round trip, keeping the links in image order
+        if results:
+            for file_id in self._share_files([results[idx] for idx in sorted(results)]):
+                drive_urls.append(f"https://drive.google.com/uc?id={file_id}")
+        
         return drive_urls
         
     def sanitize_filename(self, text: str) -> str:
         """Sanitize text for use in filename"""
-        # Remove or replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            text = text.replace(char, '')
-        
-        # Replace spaces with underscores
-        text = text.replace(' ', '_')
-        
-        # Remove multiple underscores
-        while '__' in text:
-            text = text.replace('__', '_')
-        
-        # Limit length
-        text = text[:50]
+        # Drop invalid characters, turn spaces into single underscores and limit length
+        text = MULTI_UNDERSCORE_RE.sub('_', text.translate(FILENAME_TABLE))[:50]
         
         # Remove trailing periods and spaces
         text = text.strip('. ')
@@ -617,13 +960,14 @@ class InventoryCreationWorkflow:
         self.ai_manager = EnhancedAIManager()
         self.drive_manager = GoogleDriveManager()
         self.config = self.load_config()
+        self._sku_lock = threading.Lock()
+        self._last_sku_ns = 0
         
     def load_config(self):
         """Load configuration"""
-        config_file = 'data/inventory_config.json'
-        if os.path.exists(config_file):
-            with open(config_file, 'r') as f:
-                return json.load(f)
+        config = _load_json_config('data/inventory_config.json')
+        if config is not None:
+            return config
         else:
             return {
                 'spreadsheet_id': '',
@@ -636,21 +980,19 @@ class InventoryCreationWorkflow:
     def save_config(self, config: Dict):
         """Save configuration"""
         self.config.update(config)
-        with open('data/inventory_config.json', 'w') as f:
-            json.dump(self.config, f, indent=2)
+        with open('data/inventory_config.json', 'wb') as f:
+            f.write(json_dumps(self.config, indent=True))
             
     def create_product_from_image(self, image_file, additional_data: Dict = None) -> Dict:
         """Create complete product from uploaded image"""
         
-        # Save uploaded image temporarily
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        # Keep the upload in memory; it is written to disk once, under its final name
         temp_filename = secure_filename(image_file.filename)
-        temp_path = f'uploads/temp_{timestamp}_{temp_filename}'
-        image_file.save(temp_path)
+        image_bytes = image_file.read()
         
         # Analyze with multiple AI models
         print("🤖 Analyzing with multiple AI models...")
-        ai_analysis = self.ai_manager.analyze_artwork_multimodel(temp_path)
+        ai_analysis = self.ai_manager.analyze_artwork_bytes(image_bytes, temp_filename)
         
         # Generate SKU
         sku = self.generate_sku(ai_analysis.get('artist', 'ART'))
@@ -667,10 +1009,10 @@ class InventoryCreationWorkflow:
             renamed_filename += f"-{year}"
         renamed_filename += f"-{sku}{file_extension}"
         
-        # Rename and move to final location
+        # Save under the final name
         final_path = f'uploads/{renamed_filename}'
-        os.rename(temp_path, final_path)
-        print(f"📝 Renamed image to: {renamed_filename}")
+        Path(final_path).write_bytes(image_bytes)
+        print(f"📝 Saved image as: {renamed_filename}")
         
         # Find related images in the folder
         print("🔍 Scanning for related images...")
@@ -690,8 +1032,8 @@ class InventoryCreationWorkflow:
         
         if self.config.get('drive_folder_id'):
             self.drive_manager.set_drive_folder(self.config['drive_folder_id'])
-            drive_image_url = self.drive_manager.upload_image_to_drive(
-                final_path, renamed_filename
+            drive_image_url = self.drive_manager.upload_image_bytes_to_drive(
+                image_bytes, renamed_filename
             )
             
             # Upload related images
@@ -762,26 +1104,16 @@ class InventoryCreationWorkflow:
         
     def generate_sku(self, artist: str) -> str:
         """Generate unique SKU"""
-        prefix = ''.join([c for c in artist.upper() if c.isalpha()])[:4] or 'ART'
-        timestamp = datetime.now().strftime('%y%m%d%H%M%S')
-        return f"{prefix}-{timestamp}"
+        prefix = ''.join(filter(str.isalpha, artist.upper()))[:4] or 'ART'
+        # Nanosecond clock, bumped so two SKUs from this process never share a stamp
+        with self._sku_lock:
+            stamp = self._last_sku_ns = max(time.time_ns(), self._last_sku_ns + 1)
+        return f"{prefix}-{_base36(stamp)}"
         
     def sanitize_filename(self, text: str) -> str:
         """Sanitize text for use in filename"""
-        # Remove or replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            text = text.replace(char, '')
-        
-        # Replace spaces with underscores
-        text = text.replace(' ', '_')
-        
-        # Remove multiple underscores
-        while '__' in text:
-            text = text.replace('__', '_')
-        
-        # Limit length
-        text = text[:50]
+        # Drop invalid characters, turn spaces into single underscores and limit length
+        text = MULTI_UNDERSCORE_RE.sub('_', text.translate(FILENAME_TABLE))[:50]
         
         # Remove trailing periods and spaces
         text = text.strip('. ')
@@ -793,15 +1125,15 @@ class InventoryCreationWorkflow:
         db_file = 'data/inventory_database.json'
         
         if os.path.exists(db_file):
-            with open(db_file, 'r') as f:
-                db = json.load(f)
+            with open(db_file, 'rb') as f:
+                db = json_loads(f.read())
         else:
             db = {}
             
         db[product_data['sku']] = product_data
         
-        with open(db_file, 'w') as f:
-            json.dump(db, f, indent=2, default=str)
+        with open(db_file, 'wb') as f:
+            f.write(json_dumps(db, indent=True, default=str))
 
 # Initialize workflow
 workflow = InventoryCreationWorkflow()
@@ -1547,15 +1879,8 @@ def analyze_image():
         
     file = request.files['image']
     
-    # Save temp file
-    temp_path = f'temp/{uuid.uuid4().hex}.jpg'
-    file.save(temp_path)
-    
     # Analyze with AI
-    analysis = workflow.ai_manager.analyze_artwork_multimodel(temp_path)
-    
-    # Clean up
-    os.remove(temp_path)
+    analysis = workflow.ai_manager.analyze_artwork_bytes(file.read(), file.filename)
     
     return jsonify(analysis)
 
@@ -1618,22 +1943,12 @@ def analyze_image_api():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
-    # Save temporarily
-    temp_path = os.path.join('uploads', f"temp_{int(time.time())}.jpg")
-    os.makedirs('uploads', exist_ok=True)
-    file.save(temp_path)
-    
     try:
         # Analyze with AI
-        analysis = workflow.ai_manager.analyze_artwork_multimodel(temp_path)
-        
-        # Clean up
-        os.remove(temp_path)
+        analysis = workflow.ai_manager.analyze_artwork_bytes(file.read(), file.filename)
         
         return jsonify(analysis)
     except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/inventory/create', methods=['POST'])
@@ -1645,15 +1960,11 @@ def create_inventory():
             file = request.files['image']
             auto_rename = request.form.get('auto_rename', 'false').lower() == 'true'
             
-            # Save and analyze
-            temp_path = os.path.join('uploads', f"temp_{int(time.time())}.jpg")
-            os.makedirs('uploads', exist_ok=True)
-            file.save(temp_path)
-            
-            analysis = workflow.ai_manager.analyze_artwork_multimodel(temp_path)
+            # Analyze straight from the upload
+            analysis = workflow.ai_manager.analyze_artwork_bytes(file.read(), file.filename)
             
             # Generate SKU
-            sku = f"ART-{int(time.time())}"
+            sku = workflow.generate_sku('ART')
             
             # Rename if requested
             renamed_filename = file.filename
@@ -1666,9 +1977,6 @@ def create_inventory():
                     renamed_filename += f"-{year}"
                 renamed_filename += f"-{sku}.jpg"
             
-            # Clean up
-            os.remove(temp_path)
-            
             return jsonify({
                 'success': True,
                 'sku': sku,
@@ -1680,7 +1988,7 @@ def create_inventory():
             data = request.get_json()
             
             # Create product in sheets if configured
-            sku = f"ART-{int(time.time())}"
+            sku = workflow.generate_sku('ART')
             
             if workflow.drive_manager.sheets_service:
                 try:
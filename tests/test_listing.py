@@ -2,7 +2,9 @@
 Tests for eBay Listing Automation
 """
 import pytest
+import io
 import os
+import threading
 import json
 import csv
 from pathlib import Path
@@ -170,3 +172,414 @@ class TestMetadata:
         metadata = listing["metadata"]
         assert "generated_at" in metadata, "Metadata should have generated_at"
         assert "processing_time_seconds" in metadata, "Metadata should have processing_time_seconds"
+
+
+class TestEbayItemFormat:
+    """Test conversion of inventory products to eBay inventory items"""
+
+    def test_short_title_is_unchanged(self):
+        """Verify titles within eBay's 80 character limit are kept as-is"""
+        from ebay_api_integration import eBayAPIIntegration
+
+        item = eBayAPIIntegration()._convert_to_ebay_format({"artist": "Banksy", "title": "Thrower"})
+        assert item["product"]["title"] == "Banksy - Thrower"
+
+    def test_long_title_is_truncated(self):
+        """Verify long titles are cut to 80 characters with an ellipsis"""
+        from ebay_api_integration import eBayAPIIntegration
+
+        item = eBayAPIIntegration()._convert_to_ebay_format({"artist": "Banksy", "title": "x" * 100})
+        title = item["product"]["title"]
+        assert len(title) == 80, "Title should be exactly 80 characters"
+        assert title.endswith("..."), "Truncated title should end with an ellipsis"
+
+
+class TestArtCategory:
+    """Test eBay category selection from the analyzed medium"""
+
+    def _analysis(self, medium):
+        from ebay_art_analyzer import ArtworkAnalysis
+
+        return ArtworkAnalysis(
+            title="Untitled", artist=None, medium=medium, style="Abstract", colors=["Blue"],
+            subject_matter="Shapes", condition="Excellent", estimated_year=None,
+            size_category="medium", frame_info="Unframed", signature_present=False,
+            authenticity_markers=[],
+        )
+
+    @pytest.mark.parametrize("medium, expected", [
+        ("Pencil and watercolor", 20127),
+        ("Digital print", 360010003),
+        ("Acrylic and oil", 20125),
+    ])
+    def test_medium_priority_order(self, medium, expected):
+        """Verify mixed mediums resolve by the fixed medium priority, not word order"""
+        from ebay_art_analyzer import EbayArtAnalyzer
+
+        category_id, _ = EbayArtAnalyzer().determine_category(self._analysis(medium))
+        assert category_id == expected
+
+    def test_unknown_medium_falls_back_to_mixed_media(self):
+        """Verify unrecognized mediums map to the mixed media category"""
+        from ebay_art_analyzer import EbayArtAnalyzer
+
+        category_id, _ = EbayArtAnalyzer().determine_category(self._analysis("Collage"))
+        assert category_id == 20128
+
+
+class TestListingTemplates:
+    """Test listing template selection from inventory products"""
+
+    @pytest.mark.parametrize("year, expected", [
+        ("c.1985", "vintage"),
+        ("1985-1990", "vintage"),
+        ("85", "vintage"),
+        (1975, "vintage"),
+        ("2015", "contemporary"),
+        ("", "contemporary"),
+    ])
+    def test_year_selects_template(self, year, expected):
+        """Verify approximate and two-digit years are parsed rather than rejected"""
+        from ebay_listing_automation import eBayListingAutomation
+
+        template_type, _ = eBayListingAutomation()._select_template({"year": year})
+        assert template_type == expected
+
+
+@pytest.fixture
+def ai_manager(tmp_path, monkeypatch):
+    """An AI manager with two stubbed backends and its analysis cache in a temp directory"""
+    monkeypatch.chdir(tmp_path)
+    for var in ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "GOOGLE_API_KEY", "XAI_API_KEY"):
+        monkeypatch.delenv(var, raising=False)
+    eic = pytest.importorskip("enhanced_inventory_creator")
+
+    manager = eic.EnhancedAIManager()
+    manager.calls = []
+    manager.answers = {}
+    for model, label, method, _ in eic.AI_BACKENDS[:2]:
+        manager.models[model].update(api_key="test-key", active=True)
+
+        def backend(vision_image, label=label):
+            manager.calls.append(label)
+            return manager.answers.get(label, {})
+
+        setattr(manager, method, backend)
+
+    manager.phash = eic.imagehash.hex_to_hash("0" * 16)
+    monkeypatch.setattr(eic.imagehash, "phash", lambda image: manager.phash)
+    return manager
+
+
+class TestAnalysisCache:
+    """Test reuse of AI analyses through the perceptual hash cache"""
+
+    ANSWER = {"artist": "Banksy", "title": "Thrower", "condition": "Mint"}
+
+    def _analyze(self, manager):
+        from PIL import Image
+
+        buf = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buf, "JPEG")
+        return manager.analyze_artwork_bytes(buf.getvalue(), "test.jpg")
+
+    def test_repeat_image_is_served_from_cache(self, ai_manager):
+        """Verify an exact hash match skips the models"""
+        ai_manager.answers = {"gpt-4": self.ANSWER, "claude-3": self.ANSWER}
+        self._analyze(ai_manager)
+        calls = len(ai_manager.calls)
+
+        analysis = self._analyze(ai_manager)
+        assert len(ai_manager.calls) == calls, "Cached analysis should not query the models"
+        assert analysis["condition"] == "Mint"
+
+    def test_different_image_queries_the_models(self, ai_manager):
+        """Verify a distant hash is a cache miss"""
+        import imagehash
+
+        ai_manager.answers = {"gpt-4": self.ANSWER, "claude-3": self.ANSWER}
+        self._analyze(ai_manager)
+        calls = len(ai_manager.calls)
+
+        ai_manager.phash = imagehash.hex_to_hash("f" * 16)
+        self._analyze(ai_manager)
+        assert len(ai_manager.calls) > calls, "A different image should query the models"
+
+    def test_consensus_answer_is_cached(self, ai_manager):
+        """Verify an analysis that stopped early on consensus is still cached"""
+        eic = pytest.importorskip("enhanced_inventory_creator")
+        release = threading.Event()
+        model, label, method, _ = eic.AI_BACKENDS[2]
+        ai_manager.models[model].update(api_key="test-key", active=True)
+
+        def slow_backend(vision_image):
+            release.wait(5)
+            return {}
+
+        setattr(ai_manager, method, slow_backend)
+        ai_manager.answers = {"gpt-4": self.ANSWER, "claude-3": self.ANSWER}
+        try:
+            analysis = self._analyze(ai_manager)
+            assert analysis["consensus"], "Two agreeing models should end the analysis early"
+            assert label not in analysis["models_used"]
+
+            calls = len(ai_manager.calls)
+            self._analyze(ai_manager)
+            assert len(ai_manager.calls) == calls, "Consensus analysis should be cached"
+        finally:
+            release.set()
+
+    def test_failed_backend_answer_is_not_cached(self, ai_manager):
+        """Verify a result missing a failed backend is not cached"""
+        ai_manager.answers = {"gpt-4": self.ANSWER, "claude-3": {}}
+        analysis = self._analyze(ai_manager)
+        assert analysis["models_used"] == ["gpt-4"], "A backend returning nothing should not count as used"
+
+        calls = len(ai_manager.calls)
+        self._analyze(ai_manager)
+        assert len(ai_manager.calls) > calls, "Partial analysis should not be cached"
+
+
+@pytest.fixture
+def automation(tmp_path, monkeypatch):
+    """A listing automation whose listings store lives in a temp directory"""
+    from ebay_listing_automation import eBayListingAutomation
+
+    monkeypatch.chdir(tmp_path)
+    return eBayListingAutomation()
+
+
+class TestListingsStore:
+    """Test the listings file and its append log"""
+
+    def test_listing_found_while_log_is_moved_aside(self, automation, monkeypatch):
+        """Verify a compaction moving the log between reader steps doesn't hide a listing"""
+        import ebay_listing_automation as automation_module
+
+        automation._save_listing_info("S1", {"status": "draft"})
+        list_snapshots = automation_module._log_snapshots
+
+        def compaction_starts():
+            snapshots = list_snapshots()
+            os.replace(automation_module.LISTINGS_LOG_FILE,
+                       automation_module.LISTINGS_LOG_FILE + ".test" + automation_module.LOG_SNAPSHOT_SUFFIX)
+            return snapshots
+
+        monkeypatch.setattr(automation_module, "_log_snapshots", compaction_starts)
+        status = automation.get_listing_status("S1")
+        assert status["success"], "Listing should be found while a compaction is under way"
+        assert status["listing"]["status"] == "draft"
+
+    def test_saved_listing_is_readable(self, automation):
+        """Verify a listing appended to the log is returned before any compaction"""
+        automation._save_listing_info("S1", {"status": "draft"})
+
+        status = automation.get_listing_status("S1")
+        assert status["success"], "Saved listing should be found"
+        assert status["listing"]["status"] == "draft"
+        assert status["listing"]["gallery"] == "Gauntlet Gallery"
+
+    def test_compaction_keeps_every_listing(self, automation):
+        """Verify folding the log into the listings file loses and changes nothing"""
+        import ebay_listing_automation as automation_module
+
+        for i in range(20):
+            automation._save_listing_info(f"S{i}", {"status": "draft", "n": i})
+        before = automation.get_all_listings()["listings"]
+
+        automation._compact_listings()
+        assert not os.path.exists(automation_module.LISTINGS_LOG_FILE), "Log should be folded in"
+        assert not automation_module._log_snapshots(), "Snapshots should be removed"
+        assert automation.get_all_listings()["listings"] == before
+        with open(automation_module.LISTINGS_FILE) as f:
+            assert len(json.load(f)["listings"]) == 20
+
+    def test_saves_during_compaction_are_kept(self, automation):
+        """Verify listings saved while compactions run are neither lost nor duplicated"""
+        stop = threading.Event()
+
+        def compact():
+            while not stop.is_set():
+                automation._compact_listings()
+
+        def save(writer):
+            for i in range(100):
+                automation._save_listing_info(f"W{writer}-{i}", {"status": "draft"})
+
+        compactor = threading.Thread(target=compact)
+        writers = [threading.Thread(target=save, args=(writer,)) for writer in range(2)]
+        compactor.start()
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        stop.set()
+        compactor.join()
+
+        assert len(automation.get_all_listings()["listings"]) == 200
+        automation._compact_listings()
+        assert len(automation.get_all_listings()["listings"]) == 200
+
+    def test_log_overlays_legacy_listings_file(self, automation):
+        """Verify logged listings are merged over an existing ebay_listings.json"""
+        import ebay_listing_automation as automation_module
+
+        with open(automation_module.LISTINGS_FILE, "w") as f:
+            json.dump({"listings": {"OLD": {"status": "published"}, "S1": {"status": "old"}},
+                       "last_updated": None}, f)
+        automation._save_listing_info("S1", {"status": "new"})
+        automation._save_listing_info("S2", {"status": "draft"})
+
+        for listings in (automation.get_all_listings()["listings"], dict(automation.iter_listings())):
+            assert sorted(listings) == ["OLD", "S1", "S2"]
+            assert listings["S1"]["status"] == "new", "Logged listing should supersede the file"
+
+        automation._compact_listings()
+        listings = automation.get_all_listings()["listings"]
+        assert listings["OLD"]["status"] == "published"
+        assert listings["S1"]["status"] == "new"
+
+
+class TestListingCreation:
+    """Test creating eBay listings from inventory products"""
+
+    def test_blank_cost_does_not_block_creation(self, automation, monkeypatch):
+        """Verify listings are created for products without a usable cost"""
+        monkeypatch.setattr(automation.ebay_api, "create_inventory_item",
+                            lambda product: {"success": True, "sku": product["sku"]})
+        monkeypatch.setattr(automation.ebay_api, "create_offer",
+                            lambda sku, price: {"success": True, "offer_id": "O-" + sku})
+
+        result = automation.create_listing_from_inventory(
+            {"sku": "S1", "artist": "Banksy", "title": "Thrower", "sale_price": 250, "cost": ""},
+            quiet=True)
+        assert result["success"], result.get("error")
+        assert result["price"] == 250.0
+
+    def test_batch_totals_tolerate_blank_cost(self, automation, monkeypatch):
+        """Verify batch profit totals treat an unusable cost as zero instead of failing"""
+        monkeypatch.setattr(automation.ebay_api, "ensure_valid_token", lambda: True)
+        monkeypatch.setattr(automation.ebay_api, "create_inventory_item",
+                            lambda product: {"success": True, "sku": product["sku"]})
+        monkeypatch.setattr(automation.ebay_api, "create_offer",
+                            lambda sku, price: {"success": True, "offer_id": "O-" + sku})
+
+        results = automation.batch_create_listings([
+            {"sku": "S1", "sale_price": 100, "cost": ""},
+            {"sku": "S2", "sale_price": 100, "cost": 30},
+        ])
+        assert results["successful"] == 2
+        assert results["estimated_profit_total"] == 138.0
+
+    def test_feed_listings_keep_condition_images_and_are_saved(self, automation, monkeypatch):
+        """Verify bulk feed rows carry the mapped condition and photos, and listings are recorded"""
+        import ebay_listing_automation as automation_module
+
+        uploads = []
+        monkeypatch.setattr(automation.ebay_api, "create_feed_task",
+                            lambda feed_type, schema_version: {"success": True, "task_id": "T1"})
+        monkeypatch.setattr(automation.ebay_api, "upload_feed_file",
+                            lambda task_id, file_name, content: uploads.append(content) or {"success": True})
+        monkeypatch.setattr(automation.ebay_api, "get_feed_task",
+                            lambda task_id: {"success": True, "status": "COMPLETED"})
+
+        products = [{"sku": f"S{i}", "condition": "Mint", "sale_price": 100,
+                     "photos": ["https://example.com/a.jpg", "https://example.com/b.jpg"]}
+                    for i in range(automation_module.FEED_MIN_PRODUCTS)]
+        results = automation.batch_create_listings_feed(products, poll_interval=0)
+        assert results["successful"] == len(products)
+
+        rows = list(csv.DictReader(io.StringIO(uploads[0].decode("utf-8"))))
+        assert rows[0]["*ConditionID"] == "1000", "Mint should map to eBay's New condition"
+        assert rows[0]["PicURL"] == "https://example.com/a.jpg|https://example.com/b.jpg"
+
+        status = automation.get_listing_status("S0")
+        assert status["success"], "Feed listings should be saved like per-SKU ones"
+        assert status["listing"]["task_id"] == "T1"
+
+    def test_batch_progress_is_written_while_listings_run(self, automation, monkeypatch):
+        """Verify batch progress for finished listings appears before the rest of the batch is done"""
+        import ebay_listing_automation as automation_module
+
+        written = threading.Event()
+        write_lines = automation_module._write_lines
+
+        def record_write(lines):
+            if lines:
+                written.set()
+            write_lines(lines)
+
+        def create_offer(sku, price):
+            if sku == "SLOW":
+                assert written.wait(5), "Progress should be written before the slow listing finishes"
+            return {"success": True, "offer_id": "O-" + sku}
+
+        monkeypatch.setattr(automation_module, "PROGRESS_FLUSH_LINES", 1)
+        monkeypatch.setattr(automation_module, "_write_lines", record_write)
+        monkeypatch.setattr(automation.ebay_api, "ensure_valid_token", lambda: True)
+        monkeypatch.setattr(automation.ebay_api, "create_inventory_item",
+                            lambda product: {"success": True, "sku": product["sku"]})
+        monkeypatch.setattr(automation.ebay_api, "create_offer", create_offer)
+
+        results = automation.batch_create_listings([{"sku": "FAST"}, {"sku": "SLOW"}])
+        assert results["successful"] == 2, results["errors"]
+
+
+class TestTokenPersistence:
+    """Test deferred saving of refreshed eBay tokens"""
+
+    @pytest.fixture
+    def api(self, tmp_path, monkeypatch):
+        """An API client with a refresh token, a stubbed OAuth endpoint and recorded save timers/exit hooks"""
+        import atexit
+        import ebay_api_integration as api_module
+
+        monkeypatch.chdir(tmp_path)
+        client = api_module.eBayAPIIntegration()
+        client.refresh_token = "refresh"
+
+        class Response:
+            status_code = 200
+            content = b'{"access_token": "fresh", "expires_in": 7200}'
+
+        monkeypatch.setattr(client.session, "post", lambda *args, **kwargs: Response())
+
+        client.timers = []
+
+        class Timer:
+            def __init__(self, interval, function):
+                self.daemon = False
+                client.timers.append(self)
+
+            def start(self):
+                pass
+
+            def cancel(self):
+                pass
+
+        client.exit_hooks = []
+        monkeypatch.setattr(api_module.threading, "Timer", Timer)
+        monkeypatch.setattr(atexit, "register", client.exit_hooks.append)
+        monkeypatch.setattr(atexit, "unregister", client.exit_hooks.remove)
+        return client
+
+    def test_refreshes_share_one_deferred_save(self, api):
+        """Verify back-to-back refreshes schedule a single save and exit hook"""
+        import ebay_api_integration as api_module
+
+        assert api.refresh_access_token()
+        assert api.refresh_access_token()
+        assert len(api.timers) == 1, "Refreshes before the save runs should reuse its timer"
+        assert len(api.exit_hooks) == 1
+        assert not os.path.exists(api_module.TOKENS_FILE), "Saving should be deferred"
+
+    def test_exit_flushes_pending_save(self, api):
+        """Verify the exit hook writes a pending token save and then unregisters itself"""
+        import ebay_api_integration as api_module
+
+        assert api.refresh_access_token()
+        api.exit_hooks[0]()
+
+        with open(api_module.TOKENS_FILE) as f:
+            assert json.load(f)["access_token"] == "fresh"
+        assert not api.exit_hooks, "Exit hook should be dropped once nothing is pending"